@@ -44,7 +44,15 @@ if [ "${INGEST_ON_START:-0}" = "1" ]; then
   fi
 fi
 
-if [ "${USE_GUNICORN:-0}" = "1" ]; then
+if [ "${USE_ASGI:-0}" = "1" ]; then
+  # Async list/export/API/lookup views: slow clients and streamed exports wait on the event loop, not a thread
+  echo "Starting gunicorn with uvicorn workers (ASGI)..."
+  exec gunicorn leads_dashboard.asgi:application \
+    --worker-class uvicorn.workers.UvicornWorker \
+    --bind 0.0.0.0:8000 \
+    --workers "${WEB_CONCURRENCY:-2}" \
+    --timeout "${WEB_TIMEOUT:-120}"
+elif [ "${USE_GUNICORN:-0}" = "1" ]; then
   echo "Starting gunicorn..."
   exec gunicorn leads_dashboard.wsgi:application \
     --bind 0.0.0.0:8000 \
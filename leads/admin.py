@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import State, City, Category, Source, SourceFile, Lead, Tag, LeadTag, SavedView
+from .models import State, City, Category, Source, SourceFile, Lead, Tag, LeadTag, SavedView, CategoryRollup, StateRollup, CityRollup, DataGeneration, ExportJob, FilterUsage, ResultCacheStat
 
 admin.site.register(State)
 admin.site.register(City)
@@ -10,4 +10,10 @@ admin.site.register(Lead)
 admin.site.register(Tag)
 admin.site.register(LeadTag)
 admin.site.register(SavedView)
-
+admin.site.register(CategoryRollup)
+admin.site.register(StateRollup)
+admin.site.register(CityRollup)
+admin.site.register(DataGeneration)
+admin.site.register(ExportJob)
+admin.site.register(FilterUsage)
+admin.site.register(ResultCacheStat)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+from datetime import date, datetime
+
+import ujson
+from django.urls import reverse
+
+from .pagination import akeyset_paginate, keyset_paginate
+
+# API field name -> values() path
+API_FIELDS = {
+    'id': 'id',
+    'business_name': 'business_name',
+    'category': 'category__name',
+    'state': 'state__name',
+    'city': 'city__name',
+    'category_id': 'category_id',
+    'state_id': 'state_id',
+    'city_id': 'city_id',
+    'website': 'website',
+    'email': 'email',
+    'phone': 'phone',
+    'address': 'address',
+    'domain': 'domain',
+    'quality_score': 'quality_score',
+    'extra': 'extra',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'last_seen_at': 'last_seen_at',
+}
+DEFAULT_FIELDS = [
+    'id', 'business_name', 'category', 'state', 'city',
+    'website', 'email', 'phone', 'domain', 'quality_score',
+]
+MAX_PAGE_SIZE = 1000
+
+
+class UnknownFields(ValueError):
+    pass
+
+
+def parse_fields(value: str | None) -> list[str]:
+    """The requested field names from a comma-separated `fields` parameter, in order."""
+    if not value:
+        return list(DEFAULT_FIELDS)
+    fields = list(dict.fromkeys(f.strip() for f in value.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in API_FIELDS]
+    if unknown or not fields:
+        raise UnknownFields(', '.join(unknown))
+    return fields
+
+
+def _json_value(v):
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+
+def api_page(qs, fields: list[str], order: list[str], cursor: str | None, page_size: int):
+    """One keyset page of qs as {field: value} dicts.
+
+    Only the requested columns (plus the sort keys the cursor needs) are
+    selected, and related names are single joins, so no model instances are
+    built.
+    """
+    page = keyset_paginate(_api_values(qs, fields, order), order, cursor, page_size)
+    return _api_rows(page, fields), page
+
+
+async def aapi_page(qs, fields: list[str], order: list[str], cursor: str | None, page_size: int):
+    """api_page, fetching the page with the async ORM."""
+    page = await akeyset_paginate(_api_values(qs, fields, order), order, cursor, page_size)
+    return _api_rows(page, fields), page
+
+
+def _api_values(qs, fields: list[str], order: list[str]):
+    sort_keys = [o.lstrip('-') for o in order]
+    return qs.values(*dict.fromkeys([API_FIELDS[f] for f in fields] + sort_keys))
+
+
+def _api_rows(page, fields: list[str]) -> list[dict]:
+    return [{f: _json_value(row[API_FIELDS[f]]) for f in fields} for row in page]
+
+
+def dumps(payload) -> str:
+    return ujson.dumps(payload, ensure_ascii=False)
+
+
+def export_job_payload(job) -> dict:
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'format': job.format,
+        'filters': job.filters,
+        'estimated_rows': job.estimated_rows,
+        'row_count': job.row_count,
+        'progress': job.progress,
+        'error': job.error or None,
+        'created_at': _json_value(job.created_at),
+        'finished_at': _json_value(job.finished_at),
+        'status_url': reverse('api_export_status', args=[job.pk]),
+        'download_url': reverse('export_download', args=[job.pk]) if job.status == job.DONE else None,
+    }
@@ -5,3 +5,6 @@ class LeadsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'leads'
 
+    def ready(self):
+        # Connects the signals that invalidate the reference data cache
+        from . import reference  # noqa: F401
@@ -0,0 +1,210 @@
+from __future__ import annotations
+import csv
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pacsv
+
+from .normalize import (
+    NAME_KEYS, WEBSITE_KEYS, EMAIL_KEYS, PHONE_KEYS, ADDRESS_KEYS,
+    PHONE_EXTENSION, UnsupportedFile, normalize_domain, normalize_phone, parse_row_location, rating_points, safe_extra,
+)
+
+# What str.strip() removes from ASCII text
+ASCII_WHITESPACE = ' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f'
+NULL = pa.scalar(None, pa.string())
+# Every source column normalize_row() reads
+SOURCE_COLUMNS = NAME_KEYS + WEBSITE_KEYS + EMAIL_KEYS + PHONE_KEYS + ADDRESS_KEYS + ['Rating', 'Query', 'City', 'State']
+
+
+def _nonempty(arr):
+    return pc.if_else(pc.equal(arr, ''), NULL, arr)
+
+
+def _pick(columns: dict, keys: list[str], n: int):
+    cols = [_nonempty(columns[k]) for k in keys if k in columns]
+    if not cols:
+        return pa.nulls(n, pa.string())
+    return pc.coalesce(*cols) if len(cols) > 1 else cols[0]
+
+
+def _clip(arr, n: int):
+    return pc.utf8_slice_codeunits(arr, 0, n)
+
+
+def _clean_domain(arr):
+    """Vectorized normalize_domain() clean-up; exact for ASCII values without brackets."""
+    d = pc.utf8_trim(pc.ascii_lower(arr), characters=ASCII_WHITESPACE)
+    d = pc.replace_substring_regex(d, pattern=r'(?s)^.*@', replacement='')
+    is_url = pc.or_(pc.starts_with(d, 'http://'), pc.starts_with(d, 'https://'))
+    # urlparse(d).netloc: urlsplit drops tabs/newlines, then the host ends at the first / ? or #
+    netloc = pc.replace_substring_regex(d, pattern=r'[\t\r\n]', replacement='')
+    netloc = pc.replace_substring_regex(netloc, pattern=r'(?s)^https?://([^/?#]*).*$', replacement=r'\1')
+    d = pc.if_else(is_url, netloc, d)
+    d = pc.replace_substring_regex(d, pattern=r'(?s)/.*$', replacement='')
+    return pc.replace_substring_regex(d, pattern=r'^www\.', replacement='')
+
+
+def _needs_scalar_domain(arr):
+    # Non-ASCII case mapping/whitespace and urlparse's bracket (IPv6) validation differ from the regexes
+    tricky = pc.or_(pc.invert(pc.string_is_ascii(arr)), pc.match_substring_regex(arr, r'[\[\]]'))
+    return pc.fill_null(tricky, False)
+
+
+def _normalize_phone(phone):
+    """Vectorized normalize_phone(); returns (e164, area_code, rows needing the scalar function)."""
+    s = pc.utf8_trim(phone, characters=ASCII_WHITESPACE)
+    s = pc.replace_substring_regex(s, pattern=PHONE_EXTENSION.pattern, replacement='')
+    plus = pc.starts_with(s, '+')
+    digits = pc.replace_substring_regex(s, pattern='[^0-9]', replacement='')
+    n = pc.utf8_length(digits)
+    digits = pc.if_else(pc.and_(pc.invert(plus), pc.equal(n, 10)), pc.binary_join_element_wise('1', digits, ''), digits)
+    area = pc.utf8_slice_codeunits(digits, 1, 4)
+    nanp = pc.and_(pc.equal(pc.utf8_length(digits), 11), pc.starts_with(digits, '1'))
+    nanp_ok = pc.and_(nanp, pc.match_substring_regex(area, '^[2-9]'))
+    intl = pc.and_(pc.and_(plus, pc.invert(nanp)), pc.and_(pc.greater_equal(n, 8), pc.less_equal(n, 15)))
+    e164 = pc.if_else(pc.or_(nanp_ok, intl), pc.binary_join_element_wise('+', digits, ''), NULL)
+    # Non-ASCII and the control characters Python's \s matches but RE2's does not
+    tricky = pc.or_(pc.invert(pc.string_is_ascii(phone)), pc.match_substring_regex(phone, '[\x0b\x1c-\x1f]'))
+    tricky = pc.fill_null(tricky, False)
+    return e164, pc.if_else(nanp_ok, area, NULL), tricky
+
+
+def _per_value(arr, fn, value_type):
+    """Apply a scalar function once per distinct value of arr (typically a handful per file)."""
+    encoded = pc.dictionary_encode(arr)
+    return pa.array([fn(v) for v in encoded.dictionary.to_pylist()], value_type).take(encoded.indices)
+
+
+def normalize_batch(columns: dict, n: int) -> dict[str, list]:
+    """normalize_row() over a batch of n rows given as {source column: string array}.
+
+    Empty strings stand for missing values. Returns lists per Lead field, in
+    row order; the rare rows the vectorized domain rules cannot reproduce
+    exactly go through normalize_domain() itself.
+    """
+    website = _clip(_pick(columns, WEBSITE_KEYS, n), 255)
+    email = _clip(_pick(columns, EMAIL_KEYS, n), 255)
+    phone = _clip(_pick(columns, PHONE_KEYS, n), 100)
+
+    domain = pc.if_else(
+        pc.is_valid(website), _clean_domain(website),
+        pc.if_else(pc.is_valid(email), _clean_domain(email), NULL),
+    )
+    scalar = pc.or_(_needs_scalar_domain(website), _needs_scalar_domain(email))
+    phone_normalized, area_code, scalar_phone = _normalize_phone(phone)
+
+    empty = pa.array([''] * n, pa.string())
+    rating = _per_value(columns.get('Rating', empty), rating_points, pa.int64())
+    score = pc.add(
+        pc.add(
+            pc.multiply(pc.cast(pc.is_valid(email), pa.int64()), 40),
+            pc.multiply(pc.cast(pc.is_valid(website), pa.int64()), 30),
+        ),
+        pc.add(pc.multiply(pc.cast(pc.is_valid(phone), pa.int64()), 20), rating),
+    )
+
+    # The Query column is near-constant within a file: parse each distinct value once
+    query = pc.dictionary_encode(columns.get('Query', empty))
+    parsed = [parse_row_location({'Query': q}) for q in query.dictionary.to_pylist()]
+    query_city = pa.array([c for c, _ in parsed], pa.string()).take(query.indices)
+    query_state = pa.array([s for _, s in parsed], pa.string()).take(query.indices)
+    row_city = pc.coalesce(query_city, _nonempty(columns.get('City', empty)))
+    row_state = pc.coalesce(query_state, _nonempty(columns.get('State', empty)))
+
+    out = {
+        'business_name': _clip(pc.fill_null(_pick(columns, NAME_KEYS, n), 'Unknown'), 255).to_pylist(),
+        'website': website.to_pylist(),
+        'email': email.to_pylist(),
+        'phone': phone.to_pylist(),
+        'phone_normalized': phone_normalized.to_pylist(),
+        'area_code': area_code.to_pylist(),
+        'address': _pick(columns, ADDRESS_KEYS, n).to_pylist(),
+        'domain': domain.to_pylist(),
+        'quality_score': score.to_pylist(),
+        'row_city': row_city.to_pylist(),
+        'row_state': row_state.to_pylist(),
+    }
+    for i in pc.indices_nonzero(scalar).to_pylist():
+        out['domain'][i] = normalize_domain(out['website'][i], out['email'][i])
+    for i in pc.indices_nonzero(scalar_phone).to_pylist():
+        out['phone_normalized'][i], out['area_code'][i] = normalize_phone(out['phone'][i])
+    return out
+
+
+def _records(fields: dict[str, list], extras: list[dict]) -> list[dict]:
+    names = list(fields)
+    return [
+        dict(zip(names, values), extra=extra)
+        for values, extra in zip(zip(*fields.values()), extras)
+    ]
+
+
+def iter_csv_records(path: Path, block_size: int = 1 << 20):
+    """Yield batches of normalized records (as normalize_row() builds them) from a CSV file.
+
+    Raises UnsupportedFile for input csv.DictReader would read differently:
+    ragged rows, invalid UTF-8 or a quoting layout arrow rejects.
+    """
+    with path.open(newline='', encoding='utf-8-sig', errors='ignore') as f:
+        header = next(csv.reader(f), None)
+    if header is None:
+        return
+    if not header:
+        raise UnsupportedFile(f'{path}: blank header line')
+
+    # Positional names: the header may contain duplicates, which DictReader resolves last-wins
+    names = [f'c{i}' for i in range(len(header))]
+    last = {h: i for i, h in enumerate(header)}
+    try:
+        reader = pacsv.open_csv(
+            path,
+            read_options=pacsv.ReadOptions(column_names=names, skip_rows=1, block_size=block_size),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={name: pa.string() for name in names},
+                strings_can_be_null=False, quoted_strings_can_be_null=False,
+            ),
+        )
+        for batch in reader:
+            if not batch.num_rows:
+                continue
+            columns = {h: batch.column(i) for h, i in last.items()}
+            extras = batch.rename_columns(header).to_pylist()
+            yield _records(normalize_batch(columns, batch.num_rows), extras)
+    except pa.ArrowInvalid as e:
+        raise UnsupportedFile(f'{path}: {e}') from e
+
+
+def _cell_text(value) -> str:
+    # pick() skips falsy cells and clip() stringifies the rest
+    return str(value) if value else ''
+
+
+def _rating_text(value) -> str:
+    # Keep rating_points() identical for numeric (and boolean) cells
+    if value and isinstance(value, (int, float)):
+        return repr(float(value))
+    return _cell_text(value)
+
+
+def iter_dict_records(rows, batch_rows: int = 5000):
+    """Yield batches of normalized records from an iterator of row dicts (the XLSX reader)."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            yield _dict_batch(batch)
+            batch = []
+    if batch:
+        yield _dict_batch(batch)
+
+
+def _dict_batch(rows: list[dict]) -> list[dict]:
+    present = set().union(*rows)
+    columns = {
+        k: pa.array([(_rating_text if k == 'Rating' else _cell_text)(row.get(k)) for row in rows], pa.string())
+        for k in SOURCE_COLUMNS if k in present
+    }
+    return _records(normalize_batch(columns, len(rows)), [safe_extra(row) for row in rows])
@@ -0,0 +1,220 @@
+from __future__ import annotations
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+from django.db.models import F
+
+from .counting import CountResult, smart_count
+from .filters import filter_key, filter_leads
+from .models import DataGeneration, ResultCacheStat
+from .pagination import KeysetPage, akeyset_paginate, keyset_paginate
+from .telemetry import record_filter_usage
+
+logger = logging.getLogger(__name__)
+
+LEADS = 'leads'
+KINDS = ('page', 'count', 'facets', 'lookup', 'search')
+
+STATS_UPSERT_SQL = """
+INSERT INTO leads_resultcachestat AS s (kind, hits, misses, updated_at)
+VALUES (%s, %s, %s, now())
+ON CONFLICT (kind) DO UPDATE SET
+    hits = s.hits + EXCLUDED.hits,
+    misses = s.misses + EXCLUDED.misses,
+    updated_at = now()
+"""
+
+# name -> (generation, monotonic time it was read)
+_generations: dict[str, tuple[int, float]] = {}
+
+_stats_lock = threading.Lock()
+# kind -> [hits, misses] since this process last wrote them
+_pending_stats: dict[str, list[int]] = {}
+_last_stats_flush = time.monotonic()
+
+
+def current_generation(name: str = LEADS) -> int:
+    """The data generation, re-read from the database at most every RESULT_CACHE_GENERATION_TTL seconds."""
+    cached = _fresh_generation(name)
+    if cached is not None:
+        return cached
+    # One read refreshes every generation (leads data, reference data) at once
+    return _store_generations(name, dict(DataGeneration.objects.values_list('name', 'value')))
+
+
+async def acurrent_generation(name: str = LEADS) -> int:
+    """current_generation, re-reading through the async ORM."""
+    cached = _fresh_generation(name)
+    if cached is not None:
+        return cached
+    return _store_generations(name, {n: v async for n, v in DataGeneration.objects.values_list('name', 'value')})
+
+
+def _fresh_generation(name: str) -> int | None:
+    cached = _generations.get(name)
+    if cached and time.monotonic() - cached[1] < settings.RESULT_CACHE_GENERATION_TTL:
+        return cached[0]
+    return None
+
+
+def _store_generations(name: str, values: dict[str, int]) -> int:
+    now = time.monotonic()
+    for n, value in values.items():
+        _generations[n] = (value, now)
+    _generations[name] = (values.get(name, 0), now)
+    return _generations[name][0]
+
+
+def bump_generation(name: str = LEADS) -> int:
+    """Start a new data generation: every result cached under the old one stops being read."""
+    gen, _ = DataGeneration.objects.get_or_create(name=name)
+    DataGeneration.objects.filter(pk=gen.pk).update(value=F('value') + 1)
+    _generations.pop(name, None)
+    return current_generation(name)
+
+
+class ResultCache:
+    """Query results keyed by kind, normalized filters and the current data generation.
+
+    Backed by the `results` cache alias (settings.RESULT_CACHE_URL): local
+    memory with LRU eviction, a directory, or Redis. Hits and misses are
+    counted per kind in process memory and added to ResultCacheStat every
+    RESULT_CACHE_STATS_FLUSH_SECONDS, so any backend reports totals across
+    workers.
+    """
+
+    def __init__(self, alias: str = 'results'):
+        self.backend = caches[alias]
+
+    def key(self, kind: str, filters: dict, *extra, generation: str = LEADS) -> str:
+        return f'{kind}:{current_generation(generation)}:{filter_key(filters, *extra)}'
+
+    async def akey(self, kind: str, filters: dict, *extra, generation: str = LEADS) -> str:
+        return f'{kind}:{await acurrent_generation(generation)}:{filter_key(filters, *extra)}'
+
+    def get(self, kind: str, key: str):
+        value = self.backend.get(key)
+        if _count(kind, value is not None):
+            flush_stats()
+        return value
+
+    async def aget(self, kind: str, key: str):
+        value = await self.backend.aget(key)
+        if _count(kind, value is not None):
+            await sync_to_async(flush_stats)()
+        return value
+
+    def set(self, key: str, value, timeout: int | None = None):
+        self.backend.set(key, value, settings.RESULT_CACHE_SECONDS if timeout is None else timeout)
+
+    async def aset(self, key: str, value, timeout: int | None = None):
+        await self.backend.aset(key, value, settings.RESULT_CACHE_SECONDS if timeout is None else timeout)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Hits and misses per kind written by every process so far (this one's included)."""
+        flush_stats()
+        found = {k: (h, m) for k, h, m in ResultCacheStat.objects.values_list('kind', 'hits', 'misses')}
+        return {kind: dict(zip(('hits', 'misses'), found.get(kind, (0, 0)))) for kind in KINDS}
+
+    def reset_stats(self):
+        with _stats_lock:
+            _pending_stats.clear()
+        ResultCacheStat.objects.all().delete()
+
+
+def _count(kind: str, hit: bool) -> bool:
+    """Count one lookup; True when the counters are due to be written."""
+    with _stats_lock:
+        _pending_stats.setdefault(kind, [0, 0])[0 if hit else 1] += 1
+        return time.monotonic() - _last_stats_flush >= settings.RESULT_CACHE_STATS_FLUSH_SECONDS
+
+
+def flush_stats():
+    """Add this process's counters to ResultCacheStat; a failure drops them rather than the request."""
+    global _last_stats_flush
+    with _stats_lock:
+        entries = list(_pending_stats.items())
+        _pending_stats.clear()
+        _last_stats_flush = time.monotonic()
+    if not entries:
+        return
+    try:
+        with connection.cursor() as cur:
+            for kind, (hits, misses) in entries:
+                cur.execute(STATS_UPSERT_SQL, [kind, hits, misses])
+    except DatabaseError:
+        logger.warning('Could not write result cache stats', exc_info=True)
+
+
+def cached_page(qs, filters: dict, order: list[str], cursor: str | None, page_size: int) -> KeysetPage:
+    """keyset_paginate, with the page's lead ids and cursors cached.
+
+    On a hit the rows are loaded by primary key only; the filter, search and
+    sort are not re-run. Misses are recorded in the filter telemetry.
+    """
+    results = ResultCache()
+    key = results.key('page', filters, order, cursor, page_size)
+    entry = results.get('page', key)
+    if entry is None:
+        started = time.monotonic()
+        page = keyset_paginate(qs, order, cursor, page_size)
+        # Only misses are timed: hits say nothing about the query's cost
+        record_filter_usage(filters, order, time.monotonic() - started)
+        results.set(key, {
+            'ids': [obj.pk for obj in page],
+            'next_cursor': page.next_cursor,
+            'prev_cursor': page.prev_cursor,
+        })
+        return page
+    by_id = filter_leads({}).in_bulk(entry['ids'])
+    rows = [by_id[pk] for pk in entry['ids'] if pk in by_id]
+    return KeysetPage(rows, entry['next_cursor'], entry['prev_cursor'])
+
+
+async def acached_page(qs, filters: dict, order: list[str], cursor: str | None, page_size: int) -> KeysetPage:
+    """cached_page through the async ORM and cache API."""
+    results = ResultCache()
+    key = await results.akey('page', filters, order, cursor, page_size)
+    entry = await results.aget('page', key)
+    if entry is None:
+        started = time.monotonic()
+        page = await akeyset_paginate(qs, order, cursor, page_size)
+        await sync_to_async(record_filter_usage)(filters, order, time.monotonic() - started)
+        await results.aset(key, {
+            'ids': [obj.pk for obj in page],
+            'next_cursor': page.next_cursor,
+            'prev_cursor': page.prev_cursor,
+        })
+        return page
+    by_id = await filter_leads({}).ain_bulk(entry['ids'])
+    rows = [by_id[pk] for pk in entry['ids'] if pk in by_id]
+    return KeysetPage(rows, entry['next_cursor'], entry['prev_cursor'])
+
+
+def cached_count(qs, filters: dict) -> CountResult:
+    """smart_count(qs), cached per filter set."""
+    results = ResultCache()
+    key = results.key('count', filters)
+    value = results.get('count', key)
+    if value is None:
+        value = smart_count(qs)
+        results.set(key, tuple(value))
+        return value
+    return CountResult(*value)
+
+
+async def acached_count(qs, filters: dict) -> CountResult:
+    """cached_count; smart_count's EXPLAIN and bounded COUNT run in the request's sync thread."""
+    results = ResultCache()
+    key = await results.akey('count', filters)
+    value = await results.aget('count', key)
+    if value is None:
+        value = await sync_to_async(smart_count)(qs)
+        await results.aset(key, tuple(value))
+        return value
+    return CountResult(*value)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+import json
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connections
+
+
+# Leaf relations only: the table itself, or its partitions when it is partitioned
+# (a partition never analyzed, e.g. one that is still empty, counts as 0)
+TABLE_ESTIMATE_SQL = """
+SELECT CASE WHEN bool_or(c.reltuples >= 0) THEN sum(greatest(c.reltuples, 0))::bigint END
+FROM pg_partition_tree(%s::regclass) t
+JOIN pg_class c ON c.oid = t.relid
+WHERE t.isleaf
+"""
+
+
+class CountResult(NamedTuple):
+    value: int
+    approximate: bool
+
+
+def table_estimate(model, using: str = 'default') -> int | None:
+    """Row count from pg_class.reltuples (None if the table was never analyzed).
+
+    A partitioned table's own reltuples is only set by a manual ANALYZE, so
+    its partitions' counts are summed instead.
+    """
+    with connections[using].cursor() as cur:
+        cur.execute(TABLE_ESTIMATE_SQL, [model._meta.db_table])
+        row = cur.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def plan_estimate(qs) -> int | None:
+    """Planner row estimate for a queryset, read from EXPLAIN without running it."""
+    sql, params = qs.order_by().values('pk').query.sql_with_params()
+    with connections[qs.db].cursor() as cur:
+        cur.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    try:
+        return int(plan[0]['Plan']['Plan Rows'])
+    except (LookupError, TypeError, ValueError):
+        return None
+
+
+def estimate_rows(qs) -> int | None:
+    """reltuples for unfiltered querysets, the planner estimate otherwise."""
+    if qs.query.is_empty():
+        return 0
+    if qs.query.where:
+        return plan_estimate(qs)
+    return table_estimate(qs.model, using=qs.db)
+
+
+def smart_count(qs, threshold: int | None = None) -> CountResult:
+    """Count qs exactly only when the estimate says it is cheap to do so.
+
+    Unfiltered querysets are estimated from reltuples, filtered ones from the
+    planner. Below `threshold` (settings.EXACT_COUNT_THRESHOLD) the exact
+    COUNT(*) runs; above it the estimate is returned and flagged approximate.
+    """
+    if threshold is None:
+        threshold = settings.EXACT_COUNT_THRESHOLD
+    if qs.query.is_empty():
+        return CountResult(0, False)
+    estimate = estimate_rows(qs)
+    if estimate is None or estimate < threshold:
+        return CountResult(qs.count(), False)
+    return CountResult(estimate, True)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+import re
+from difflib import SequenceMatcher
+from itertools import groupby
+from typing import NamedTuple
+
+from django.db import connection
+
+from .models import Lead, LeadTag
+from .normalize import normalize_phone
+
+# Domains shared by unrelated businesses (webmail, site builders): never a blocking key or a match signal
+SHARED_DOMAINS = (
+    'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'aol.com', 'icloud.com', 'live.com',
+    'msn.com', 'comcast.net', 'att.net', 'sbcglobal.net', 'verizon.net', 'me.com', 'mail.com',
+    'facebook.com', 'business.site', 'wixsite.com', 'godaddysites.com', 'squarespace.com', 'yelp.com',
+)
+
+# Words dropped from business names before comparing them
+NAME_NOISE = ('llc', 'inc', 'co', 'corp', 'corporation', 'ltd', 'the', 'company', 'pllc', 'pc')
+
+_NAME_SQL = (
+    "NULLIF(regexp_replace(regexp_replace(lower(business_name), "
+    "'\\m(" + '|'.join(NAME_NOISE) + ")\\M', '', 'g'), '[^a-z0-9]+', '', 'g'), '')"
+)
+_DIGITS_SQL = "regexp_replace(phone, '\\D', '', 'g')"
+
+# Blocking key name -> SQL expression over leads_lead (NULL: the row is in no block)
+BLOCKING_KEYS = {
+    'domain': (
+        "CASE WHEN domain IS NOT NULL AND regexp_replace(lower(domain), '^www\\.', '') NOT IN %(shared)s "
+        "THEN NULLIF(regexp_replace(lower(domain), '^www\\.', ''), '') END"
+    ),
+    'phone': f"CASE WHEN length({_DIGITS_SQL}) >= 10 THEN right({_DIGITS_SQL}, 10) END",
+    'name_city': f"CASE WHEN city_id IS NOT NULL AND {_NAME_SQL} <> 'unknown' THEN city_id::text || ':' || {_NAME_SQL} END",
+}
+
+BLOCKS_SQL = """
+WITH k AS (
+    SELECT id, {expr} AS key FROM leads_lead
+), blocks AS (
+    SELECT key FROM k WHERE key IS NOT NULL GROUP BY key HAVING count(*) BETWEEN 2 AND %(max_block)s
+)
+SELECT k.key, l.id, l.business_name, l.email, l.domain, l.phone, l.city_id, l.quality_score
+FROM k JOIN blocks USING (key) JOIN leads_lead l ON l.id = k.id
+ORDER BY k.key, l.id
+"""
+
+OVERSIZED_SQL = """
+SELECT count(*), coalesce(sum(n), 0) FROM (
+    SELECT count(*) AS n FROM (SELECT {expr} AS key FROM leads_lead) k
+    WHERE key IS NOT NULL GROUP BY key HAVING count(*) > %(max_block)s
+) big
+"""
+
+# Fields filled from the duplicates when the surviving lead lacks them
+FILL_FIELDS = ['website', 'email', 'phone', 'address', 'domain', 'category_id', 'state_id', 'city_id']
+
+_NOISE_RE = re.compile(r'\b(' + '|'.join(NAME_NOISE) + r')\b')
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+_NUMBER_RE = re.compile(r'\d+')
+
+
+def normalize_business_name(name: str | None) -> str:
+    """Same as the SQL name key: lower case, legal-form words and punctuation removed."""
+    return _NON_ALNUM_RE.sub('', _NOISE_RE.sub('', (name or '').lower()))
+
+
+def phone_digits(phone: str | None) -> str:
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:] if len(digits) >= 10 else ''
+
+
+def clean_domain(domain: str | None) -> str:
+    d = (domain or '').lower()
+    d = d[4:] if d.startswith('www.') else d
+    return '' if d in SHARED_DOMAINS else d
+
+
+class Candidate(NamedTuple):
+    id: int
+    name: str
+    email: str
+    domain: str
+    phone: str
+    city_id: int | None
+    quality_score: int
+
+    @classmethod
+    def from_row(cls, row) -> Candidate:
+        _, pk, name, email, domain, phone, city_id, score = row
+        return cls(
+            pk, normalize_business_name(name), (email or '').lower(),
+            clean_domain(domain), phone_digits(phone), city_id, score,
+        )
+
+
+def similarity(a: Candidate, b: Candidate) -> float:
+    """Score in about [-0.6, 1]: how likely two leads are the same business."""
+    if a.email and a.email == b.email:
+        return 1.0
+    score = 0.0
+    if a.domain and a.domain == b.domain:
+        score += 0.4
+    if a.phone and b.phone:
+        score += 0.3 if a.phone == b.phone else -0.1
+    # Names differing only in a number ("Store 12" / "Store 14") are usually other locations
+    if a.name and b.name and _NUMBER_RE.findall(a.name) == _NUMBER_RE.findall(b.name):
+        score += 0.3 * SequenceMatcher(None, a.name, b.name).ratio()
+    if a.city_id and b.city_id:
+        # Same domain in another city is usually another branch
+        score += 0.2 if a.city_id == b.city_id else -0.3
+    if a.email and b.email:
+        score -= 0.2
+    return score
+
+
+def cluster_block(block: list[Candidate], threshold: float) -> list[list[int]]:
+    """Groups of 2+ lead ids linked by pairs scoring at least threshold (single linkage)."""
+    parent = list(range(len(block)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(block)):
+        for j in range(i + 1, len(block)):
+            if find(i) != find(j) and similarity(block[i], block[j]) >= threshold:
+                parent[find(j)] = find(i)
+    groups: dict[int, list[int]] = {}
+    for i, c in enumerate(block):
+        groups.setdefault(find(i), []).append(c.id)
+    return [ids for ids in groups.values() if len(ids) > 1]
+
+
+def _params(max_block: int) -> dict:
+    return {'max_block': max_block, 'shared': SHARED_DOMAINS}
+
+
+def iter_blocks(key: str, max_block: int, chunk_size: int):
+    """Yield (key value, [Candidate]) for every block of 2..max_block leads sharing a blocking key.
+
+    Rows come off a server-side cursor in key order, so only one block is held
+    in memory at a time.
+    """
+    sql = BLOCKS_SQL.format(expr=BLOCKING_KEYS[key])
+    with connection.chunked_cursor() as cur:
+        cur.cursor.itersize = chunk_size
+        cur.execute(sql, _params(max_block))
+        for value, rows in groupby(cur, key=lambda r: r[0]):
+            yield value, [Candidate.from_row(r) for r in rows]
+
+
+def oversized_blocks(key: str, max_block: int) -> tuple[int, int]:
+    """(blocks, leads) skipped because a key value is shared by more than max_block leads."""
+    with connection.cursor() as cur:
+        cur.execute(OVERSIZED_SQL.format(expr=BLOCKING_KEYS[key]), _params(max_block))
+        blocks, leads = cur.fetchone()
+    return blocks, int(leads)
+
+
+def _survivor_rank(lead: Lead):
+    filled = sum(1 for f in FILL_FIELDS if getattr(lead, f))
+    return (-lead.quality_score, -filled, lead.id)
+
+
+def merge_cluster(ids: list[int]) -> int:
+    """Merge the leads in ids into the best of them; returns the number of leads removed.
+
+    Must run inside a transaction. The rows are locked and re-read, the
+    survivor (highest score, then most fields, then oldest) takes every field
+    it lacks from the others, their tags move to it and they are deleted.
+    """
+    leads = sorted(
+        Lead.objects.select_for_update().filter(id__in=ids).defer('search_vector'),
+        key=_survivor_rank,
+    )
+    if len(leads) < 2:
+        return 0
+    survivor, duplicates = leads[0], leads[1:]
+    for f in FILL_FIELDS:
+        if not getattr(survivor, f):
+            setattr(survivor, f, next((getattr(d, f) for d in duplicates if getattr(d, f)), getattr(survivor, f)))
+    extra = {}
+    for d in reversed(duplicates):
+        extra.update(d.extra or {})
+    survivor.extra = {**extra, **(survivor.extra or {})}
+    survivor.created_at = min(lead.created_at for lead in leads)
+    survivor.phone_normalized, survivor.area_code = normalize_phone(survivor.phone)
+
+    dup_ids = [d.id for d in duplicates]
+    tag_ids = set(LeadTag.objects.filter(lead_id__in=dup_ids).values_list('tag_id', flat=True))
+    LeadTag.objects.bulk_create([LeadTag(lead=survivor, tag_id=t) for t in tag_ids], ignore_conflicts=True)
+    # Delete first: the survivor may take over their email/domain, which are unique
+    Lead.objects.filter(id__in=dup_ids).delete()
+    survivor.save()
+    return len(dup_ids)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from django.db.models.functions import Lower
+
+from .models import State, City, Category
+
+
+def clean_name(name, max_length: int) -> str:
+    return ' '.join(str(name).split())[:max_length]
+
+
+def normalize_name(name) -> str:
+    return ' '.join(str(name).split()).casefold()
+
+
+def _refetch(qs, names, *extra):
+    """(id, name, *extra) rows whose lower(name) matches one of names, lowest id first."""
+    return (
+        qs.alias(lower_name=Lower('name'))
+        .filter(lower_name__in={n.lower() for n in names})
+        .order_by('id')
+        .values_list('id', 'name', *extra)
+    )
+
+
+class DimensionResolver:
+    """In-process cache of State/City/Category ids keyed by normalized name.
+
+    Everything is preloaded once; missing names are created in batches with
+    bulk_create(ignore_conflicts=True) and their ids re-fetched, which is safe
+    when several ingest processes create the same value concurrently. The
+    unique constraints are case-sensitive, so the re-fetch matches lower(name)
+    and prefers the lowest id: a name another worker created in a different
+    case ("Austin" / "AUSTIN") is still found.
+    """
+
+    def __init__(self):
+        self.states: dict[str, int] = {}
+        self.cities: dict[tuple[int, str], int] = {}
+        self.categories: dict[str, int] = {}
+        self.stats = {
+            'state': {'hits': 0, 'misses': 0},
+            'city': {'hits': 0, 'misses': 0},
+            'category': {'hits': 0, 'misses': 0},
+        }
+        self.load()
+
+    def reset(self):
+        self.states.clear()
+        self.cities.clear()
+        self.categories.clear()
+        self.load()
+
+    def merge_stats(self, stats: dict):
+        for kind, s in stats.items():
+            for k, v in s.items():
+                self.stats[kind][k] += v
+
+    def load(self):
+        for pk, name in State.objects.values_list('id', 'name'):
+            self.states.setdefault(normalize_name(name), pk)
+        for pk, name, state_id in City.objects.values_list('id', 'name', 'state_id'):
+            self.cities.setdefault((state_id, normalize_name(name)), pk)
+        for pk, name in Category.objects.values_list('id', 'name'):
+            self.categories.setdefault(normalize_name(name), pk)
+
+    def _count(self, kind: str, hit: bool):
+        self.stats[kind]['hits' if hit else 'misses'] += 1
+
+    def ensure_states(self, names):
+        missing = {}
+        for name in names:
+            key = normalize_name(clean_name(name, 100))
+            if not key:
+                continue
+            hit = key in self.states
+            self._count('state', hit)
+            if not hit:
+                missing.setdefault(key, clean_name(name, 100))
+        if missing:
+            State.objects.bulk_create([State(name=n) for n in missing.values()], ignore_conflicts=True)
+            for pk, name in _refetch(State.objects, missing.values()):
+                self.states.setdefault(normalize_name(name), pk)
+
+    def ensure_cities(self, pairs):
+        missing = {}
+        for name, state_id in pairs:
+            key = (state_id, normalize_name(clean_name(name, 150)))
+            if not key[1]:
+                continue
+            hit = key in self.cities
+            self._count('city', hit)
+            if not hit:
+                missing.setdefault(key, clean_name(name, 150))
+        if missing:
+            City.objects.bulk_create(
+                [City(name=n, state_id=state_id) for (state_id, _), n in missing.items()],
+                ignore_conflicts=True,
+            )
+            rows = _refetch(City.objects.filter(state_id__in={state_id for state_id, _ in missing}), missing.values(), 'state_id')
+            for pk, name, state_id in rows:
+                self.cities.setdefault((state_id, normalize_name(name)), pk)
+
+    def ensure_categories(self, names):
+        missing = {}
+        for name in names:
+            key = normalize_name(clean_name(name, 150))
+            if not key:
+                continue
+            hit = key in self.categories
+            self._count('category', hit)
+            if not hit:
+                missing.setdefault(key, clean_name(name, 150))
+        if missing:
+            Category.objects.bulk_create([Category(name=n) for n in missing.values()], ignore_conflicts=True)
+            for pk, name in _refetch(Category.objects, missing.values()):
+                self.categories.setdefault(normalize_name(name), pk)
+
+    def state_id(self, name) -> int | None:
+        if not name:
+            return None
+        self.ensure_states([name])
+        return self.states.get(normalize_name(clean_name(name, 100)))
+
+    def city_id(self, name, state_id) -> int | None:
+        if not name or not state_id:
+            return None
+        self.ensure_cities([(name, state_id)])
+        return self.cities.get((state_id, normalize_name(clean_name(name, 150))))
+
+    def category_id(self, name) -> int | None:
+        if not name:
+            return None
+        self.ensure_categories([name])
+        return self.categories.get(normalize_name(clean_name(name, 150)))
+
+    def resolve_locations(self, recs: list[dict], state_id, city_id) -> list[tuple]:
+        """Resolve (state_id, city_id) for a batch of normalized rows.
+
+        Row-level names win over the file-level ids, exactly as in the row path:
+        a row state replaces the file state, and a row city is only looked up
+        once a state is known.
+        """
+        self.ensure_states(r['row_state'] for r in recs if r['row_state'])
+        states = []
+        for r in recs:
+            st = state_id
+            if r['row_state']:
+                st = self.states.get(normalize_name(clean_name(r['row_state'], 100)), st)
+            states.append(st)
+
+        self.ensure_cities((r['row_city'], st) for r, st in zip(recs, states) if st and r['row_city'])
+        out = []
+        for r, st in zip(recs, states):
+            ct = city_id
+            if st and r['row_city']:
+                ct = self.cities.get((st, normalize_name(clean_name(r['row_city'], 150))), ct)
+            out.append((st, ct))
+        return out
+
+    def report(self) -> str:
+        return ', '.join(
+            f"{kind}: {s['hits']} hits / {s['misses']} misses"
+            for kind, s in self.stats.items()
+        )
@@ -0,0 +1,115 @@
+from __future__ import annotations
+import os
+import re
+import secrets
+import socket
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .counting import smart_count
+from .exporting import write_csv_gz, write_parquet
+from .filters import filter_leads
+from .models import ExportJob
+
+WRITERS = {
+    ExportJob.CSV_GZ: write_csv_gz,
+    ExportJob.PARQUET: write_parquet,
+}
+
+
+class ClaimLost(Exception):
+    """The job was requeued while this worker was running it."""
+
+
+def worker_name() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue_export(filters: dict, sort: list[str], fmt: str = ExportJob.CSV_GZ) -> ExportJob:
+    """Queue an export of the leads matching filters, in sort order."""
+    if fmt not in WRITERS:
+        fmt = ExportJob.CSV_GZ
+    qs = filter_leads(filters)
+    return ExportJob.objects.create(
+        filters=filters, sort=sort, format=fmt,
+        estimated_rows=smart_count(qs).value,
+    )
+
+
+def claim_next_job() -> ExportJob | None:
+    """Mark the oldest queued job running and return it; concurrent workers never get the same job."""
+    with transaction.atomic():
+        job = (
+            ExportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ExportJob.QUEUED).order_by('id').first()
+        )
+        if job is None:
+            return None
+        job.status = ExportJob.RUNNING
+        job.started_at = timezone.now()
+        # A token per claim, so a requeued job's first run can tell it no longer owns it
+        job.worker = f'{worker_name()}:{secrets.token_hex(4)}'
+        job.save(update_fields=['status', 'started_at', 'worker', 'updated_at'])
+    return job
+
+
+def requeue_stale_jobs(minutes: int) -> int:
+    """Put running jobs whose worker stopped reporting progress back in the queue."""
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    return ExportJob.objects.filter(status=ExportJob.RUNNING, updated_at__lt=cutoff).update(
+        status=ExportJob.QUEUED, row_count=0, worker='', updated_at=timezone.now(),
+    )
+
+
+def run_job(job: ExportJob, chunk_size: int) -> ExportJob | None:
+    """Write the job's file, recording progress after every chunk.
+
+    Rows are streamed off a server-side cursor into a .part file of this
+    claim, which is renamed into place once complete, so a finished path is
+    always a whole file. Returns None, leaving the job alone, if it was
+    requeued meanwhile: the worker that claimed it since owns it.
+    """
+    root = Path(settings.EXPORT_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    path = root / job.filename
+    part = path.with_name(f"{path.name}.{re.sub(r'[^A-Za-z0-9_.-]', '-', job.worker)}.part")
+    claimed = ExportJob.objects.filter(pk=job.pk, worker=job.worker, status=ExportJob.RUNNING)
+
+    def progress(rows: int):
+        if not claimed.update(row_count=rows, updated_at=timezone.now()):
+            raise ClaimLost(job.pk)
+
+    qs = filter_leads(job.filters).order_by(*(job.sort or ['id']))
+    error = None
+    try:
+        rows = WRITERS[job.format](qs, part, chunk_size, progress)
+    except ClaimLost:
+        part.unlink(missing_ok=True)
+        return None
+    except Exception as e:
+        error = e
+    with transaction.atomic():
+        # Locks the job row until the file is in place: a requeue waits, then finds the job finished
+        if not claimed.update(updated_at=timezone.now()):
+            part.unlink(missing_ok=True)
+            return None
+        if error is None:
+            try:
+                os.replace(part, path)
+            except OSError as e:
+                error = e
+        if error is None:
+            job.status = ExportJob.DONE
+            job.row_count = rows
+            job.output_path = str(path)
+        else:
+            part.unlink(missing_ok=True)
+            job.status = ExportJob.FAILED
+            job.error = f'{type(error).__name__}: {error}'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'row_count', 'output_path', 'finished_at', 'updated_at'])
+    return job
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import csv
+import gzip
+import zlib
+from itertools import islice
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+
+# (CSV header, values_list path)
+EXPORT_COLUMNS = [
+    ('Business Name', 'business_name'),
+    ('Category', 'category__name'),
+    ('State', 'state__name'),
+    ('City', 'city__name'),
+    ('Website', 'website'),
+    ('Email', 'email'),
+    ('Phone', 'phone'),
+    ('Domain', 'domain'),
+    ('Score', 'quality_score'),
+]
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(qs, chunk_size: int):
+    """Yield tuples of the export columns from a server-side cursor."""
+    return _export_values(qs).iterator(chunk_size=chunk_size)
+
+
+def _export_values(qs):
+    return qs.values_list(*[path for _, path in EXPORT_COLUMNS])
+
+
+def iter_csv(qs, chunk_size: int):
+    """Yield the export as CSV text, one block per fetched chunk of rows.
+
+    Only the exported columns are selected and rows come off a server-side
+    cursor, so memory use is bounded by chunk_size whatever the result size.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    lines = []
+    for row in iter_export_rows(qs, chunk_size):
+        lines.append(writer.writerow(['' if v is None else v for v in row]))
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+async def aiter_csv(qs, chunk_size: int):
+    """iter_csv for async streaming responses.
+
+    Each block is fetched and formatted on the request's sync thread, so the
+    event loop only hands finished text to the client. (Django 5.0's
+    values_list().aiterator() opens its cursor on the event loop and fails,
+    so blocks are pulled from iter_csv the way aiterator() pulls chunks.)
+    """
+    # A generator: nothing runs until the first next()
+    blocks = iter_csv(qs, chunk_size)
+    next_block = sync_to_async(next)
+    while (block := await next_block(blocks, None)) is not None:
+        yield block
+
+
+def gzip_stream(chunks, level: int = 6):
+    """Compress an iterable of text chunks into a gzip byte stream on the fly."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = z.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield z.flush()
+
+
+async def agzip_stream(chunks, level: int = 6):
+    """gzip_stream over an async iterable of text chunks."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = z.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield z.flush()
+
+
+def iter_export_chunks(qs, chunk_size: int):
+    """Yield lists of up to chunk_size export tuples, read off a server-side cursor."""
+    rows = iter_export_rows(qs, chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def write_csv_gz(qs, path: Path, chunk_size: int, progress=None) -> int:
+    """Write the export to a gzip CSV file, calling progress(rows so far) after each chunk."""
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([header for header, _ in EXPORT_COLUMNS])
+        for chunk in iter_export_chunks(qs, chunk_size):
+            writer.writerows(['' if v is None else v for v in row] for row in chunk)
+            count += len(chunk)
+            if progress:
+                progress(count)
+    return count
+
+
+def write_parquet(qs, path: Path, chunk_size: int, progress=None) -> int:
+    """Write the export to a Parquet file (one row group per chunk); requires pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (header, pa.int64() if path_ == 'quality_score' else pa.string())
+        for header, path_ in EXPORT_COLUMNS
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for chunk in iter_export_chunks(qs, chunk_size):
+            columns = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema,
+            ))
+            count += len(chunk)
+            if progress:
+                progress(count)
+    return count
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import connections, transaction, OperationalError
+from django.db.models import BooleanField, ExpressionWrapper, Q, Sum
+
+from .caching import ResultCache
+from .counting import estimate_rows
+from .models import CategoryRollup, City, StateRollup, CityRollup
+
+FACET_SQL = """
+SELECT GROUPING(f.category_id, f.state_id, f.city_id, f.has_email, f.has_website),
+       f.category_id, f.state_id, f.city_id, f.has_email, f.has_website, COUNT(*)
+FROM ({inner}) f (category_id, state_id, city_id, has_email, has_website)
+GROUP BY GROUPING SETS ((f.category_id), (f.state_id), (f.city_id), (f.has_email), (f.has_website))
+"""
+
+# GROUPING() bitmask (first column = highest bit) -> facet the row belongs to
+GROUPING_SETS = {
+    0b01111: 'category',
+    0b10111: 'state',
+    0b11011: 'city',
+    0b11101: 'has_email',
+    0b11110: 'has_website',
+}
+
+
+def _empty(source: str, coverage: int | None) -> dict:
+    return {
+        'category': {}, 'state': {}, 'city': [], 'city_names': {},
+        'has_email': coverage, 'has_website': coverage,
+        'source': source,
+    }
+
+
+def _filled(field: str):
+    return ExpressionWrapper(Q(**{f'{field}__isnull': False}) & ~Q(**{field: ''}), output_field=BooleanField())
+
+
+def grouped_facets(qs, top_cities: int, timeout_ms: int) -> dict:
+    """All facet counts for qs in one scan, using GROUPING SETS over the filtered rows."""
+    inner = qs.order_by().annotate(
+        _has_email=_filled('email'), _has_website=_filled('website'),
+    ).values_list('category_id', 'state_id', 'city_id', '_has_email', '_has_website')
+    sql, params = inner.query.sql_with_params()
+
+    result = _empty('query', 0)
+    cities = {}
+    with transaction.atomic(using=qs.db), connections[qs.db].cursor() as cur:
+        # Facets must never make the list page slower than it is without them
+        cur.execute('SET LOCAL statement_timeout = %s', [int(timeout_ms)])
+        cur.execute(FACET_SQL.format(inner=sql), params)
+        for grouping, category_id, state_id, city_id, has_email, has_website, n in cur.fetchall():
+            facet = GROUPING_SETS.get(grouping)
+            if facet == 'category' and category_id is not None:
+                result['category'][category_id] = n
+            elif facet == 'state' and state_id is not None:
+                result['state'][state_id] = n
+            elif facet == 'city' and city_id is not None:
+                cities[city_id] = n
+            elif facet == 'has_email' and has_email:
+                result['has_email'] = n
+            elif facet == 'has_website' and has_website:
+                result['has_website'] = n
+    result['city'] = sorted(cities.items(), key=lambda kv: -kv[1])[:top_cities]
+    return result
+
+
+def rollup_facets(filters: dict, top_cities: int) -> dict:
+    """The facet counts the rollup tables can answer exactly for these filters.
+
+    Rollups count leads per single category, state or city, so a facet is
+    only filled while the filters stay within its own dimension (state
+    counts under a state filter, not under a category filter). The others
+    are left empty, and the coverage counts None, rather than showing
+    whole-table totals as if they described the filtered leads.
+    """
+    result = _empty('rollup', None)
+    active = set(filters)
+    if active <= {'category'}:
+        result['category'] = dict(CategoryRollup.objects.filter(**_pk(filters, 'category')).values_list('category_id', 'lead_count'))
+    if active <= {'state'}:
+        result['state'] = dict(StateRollup.objects.filter(**_pk(filters, 'state')).values_list('state_id', 'lead_count'))
+    if active <= {'state', 'city'}:
+        # A city's rollup row carries its state, so city counts stay exact under a state filter
+        cities = CityRollup.objects.filter(**_pk(filters, 'city'))
+        if 'state' in filters:
+            cities = cities.filter(state_id=filters['state'])
+        result['city'] = list(cities.order_by('-lead_count').values_list('city_id', 'lead_count')[:top_cities])
+        totals = cities if 'city' in filters else StateRollup.objects.filter(**_pk(filters, 'state'))
+    elif active <= {'category'}:
+        totals = CategoryRollup.objects.filter(**_pk(filters, 'category'))
+    else:
+        return result
+    agg = totals.aggregate(email=Sum('email_count'), website=Sum('website_count'))
+    result['has_email'] = agg['email'] or 0
+    result['has_website'] = agg['website'] or 0
+    return result
+
+
+def _pk(filters: dict, name: str) -> dict:
+    return {'pk': filters[name]} if name in filters else {}
+
+
+def compute_facets(qs, filters: dict) -> dict:
+    """Facet counts for the filtered leads, cached per filter set and data generation.
+
+    Small result sets are counted exactly with one grouped query under a
+    statement_timeout of FACET_TIMEOUT_MS. Sets the planner expects to exceed
+    FACET_EXACT_LIMIT rows, or queries that hit the timeout, are answered from
+    the rollup tables instead, leaving out the facets rollups cannot give
+    for the active filters.
+    """
+    results = ResultCache()
+    key = results.key('facets', filters)
+    result = results.get('facets', key)
+    if result is not None:
+        return result
+
+    top_cities = settings.FACET_TOP_CITIES
+    estimate = estimate_rows(qs)
+    if estimate is not None and estimate > settings.FACET_EXACT_LIMIT:
+        result = rollup_facets(filters, top_cities)
+    else:
+        try:
+            result = grouped_facets(qs, top_cities, settings.FACET_TIMEOUT_MS)
+        except OperationalError:
+            result = rollup_facets(filters, top_cities)
+    if result['city']:
+        # Cached with the counts: the page names the top cities without loading the City table
+        city_ids = [cid for cid, _ in result['city']]
+        result['city_names'] = dict(City.objects.filter(id__in=city_ids).values_list('id', 'name'))
+    results.set(key, result, settings.FACET_CACHE_SECONDS)
+    return result
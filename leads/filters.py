@@ -0,0 +1,93 @@
+from __future__ import annotations
+import hashlib
+import json
+import re
+
+from .models import Lead
+from .normalize import NON_DIGITS, normalize_phone
+from .search import apply_search
+
+SORT_FIELDS = ['business_name', 'quality_score', 'state__name', 'city__name']
+TRUTHY = ('1', 'true', 'True')
+AREA_CODE = re.compile(r'[2-9][0-9]{2}')
+
+
+def phone_prefix(value) -> str | None:
+    """The E.164 number, or leading part of one, a phone filter matches ('512-555' -> '+1512555')."""
+    value = str(value or '').strip()
+    e164, _ = normalize_phone(value)
+    if e164:
+        return e164
+    digits = NON_DIGITS.sub('', value)
+    if len(digits) < 3:
+        return None
+    # North American area codes never start with 1, so a leading 1 is the country code
+    if value.startswith('+') or digits.startswith('1'):
+        return '+' + digits
+    return '+1' + digits
+
+
+def normalize_filters(params) -> dict:
+    """Canonical form of the lead filters in `params` (a QueryDict or dict).
+
+    Empty and malformed values are dropped, so equivalent requests produce the
+    same dict (and the same filter_key).
+    """
+    filters = {}
+    q = (params.get('q') or '').strip()
+    if q:
+        filters['q'] = q
+    for name in ('state', 'city', 'category'):
+        value = str(params.get(name) or '').strip()
+        if value.isdigit():
+            filters[name] = int(value)
+    phone = phone_prefix(params.get('phone'))
+    if phone:
+        filters['phone'] = phone
+    area_codes = sorted({c for c in re.split(r'[\s,]+', str(params.get('area_code') or '')) if AREA_CODE.fullmatch(c)})
+    if area_codes:
+        filters['area_code'] = area_codes
+    for name in ('has_email', 'has_website'):
+        if params.get(name) in TRUTHY or params.get(name) is True:
+            filters[name] = True
+    return filters
+
+
+def filter_key(filters: dict, *extra) -> str:
+    raw = json.dumps([filters, extra], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def filter_leads(filters: dict):
+    qs = Lead.objects.select_related('city', 'state', 'category').defer('search_vector')
+    q = filters.get('q')
+    if q:
+        qs = apply_search(qs, q)
+    if 'state' in filters:
+        qs = qs.filter(state_id=filters['state'])
+    if 'city' in filters:
+        qs = qs.filter(city_id=filters['city'])
+    if 'category' in filters:
+        qs = qs.filter(category_id=filters['category'])
+    if 'phone' in filters:
+        # Exact number or prefix, both a range scan of lead_phone_norm_idx
+        qs = qs.filter(phone_normalized__startswith=filters['phone'])
+    if 'area_code' in filters:
+        qs = qs.filter(area_code__in=filters['area_code'])
+    if filters.get('has_email'):
+        qs = qs.exclude(email__isnull=True).exclude(email__exact='')
+    if filters.get('has_website'):
+        qs = qs.exclude(website__isnull=True).exclude(website__exact='')
+    return qs
+
+
+def sort_order(params) -> list[str]:
+    # Always end in the primary key so the order is total (required by keyset pagination)
+    searching = bool((params.get('q') or '').strip())
+    sort = params.get('sort') or ('relevance' if searching else 'business_name')
+    if sort == 'relevance':
+        # `rank` only exists on searched querysets (see search.apply_search)
+        return ['-rank', '-id'] if searching else ['business_name', 'id']
+    if sort not in SORT_FIELDS:
+        sort = 'business_name'
+    return [sort, 'id']
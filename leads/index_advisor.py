@@ -0,0 +1,274 @@
+from __future__ import annotations
+import hashlib
+import json
+from typing import NamedTuple
+
+from django.db import connection, migrations, models, transaction
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from django.db.models import Q
+
+from .counting import plan_estimate, table_estimate
+from .filters import filter_leads
+from .models import FilterUsage, Lead
+
+# Filter name -> column compared with = / IN (any order works for these, so they lead the index)
+EQUALITY_COLUMNS = {'state': 'state_id', 'city': 'city_id', 'category': 'category_id', 'area_code': 'area_code'}
+# Sort key -> column; joined sorts (state__name, city__name) and relevance cannot use a lead index
+SORT_COLUMNS = {'business_name': 'business_name', 'quality_score': 'quality_score', 'id': 'id'}
+# Boolean filters become the index predicate (a partial index)
+PARTIAL_CONDITIONS = {
+    'has_email': Q(email__isnull=False) & ~Q(email=''),
+    'has_website': Q(website__isnull=False) & ~Q(website=''),
+}
+ABBREVIATIONS = {
+    'state_id': 'st', 'city_id': 'city', 'category_id': 'cat', 'area_code': 'ac',
+    'business_name': 'name', 'quality_score': 'score', 'id': 'id',
+    'has_email': 'em', 'has_website': 'web',
+}
+# Btree tuple header + item pointer, added to the column widths in size estimates
+TUPLE_OVERHEAD = 16
+
+EXISTING_INDEXES_SQL = """
+SELECT c.relname,
+       array(SELECT a.attname FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, n)
+             JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum ORDER BY k.n),
+       i.indpred IS NOT NULL
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+JOIN pg_am am ON am.oid = c.relam
+WHERE i.indrelid = 'leads_lead'::regclass AND am.amname = 'btree'
+"""
+
+# Partition indexes are summed into the partitioned index they belong to
+UNUSED_INDEXES_SQL = """
+SELECT coalesce(pt.relname, s.relname), coalesce(pi.relname, s.indexrelname), sum(pg_relation_size(s.indexrelid))
+FROM pg_stat_user_indexes s
+JOIN pg_index i ON i.indexrelid = s.indexrelid
+LEFT JOIN pg_inherits ii ON ii.inhrelid = s.indexrelid
+LEFT JOIN pg_class pi ON pi.oid = ii.inhparent
+LEFT JOIN pg_inherits ti ON ti.inhrelid = s.relid
+LEFT JOIN pg_class pt ON pt.oid = ti.inhparent
+WHERE coalesce(pt.relname, s.relname) LIKE 'leads\\_%%' AND NOT i.indisunique AND NOT i.indisprimary
+GROUP BY 1, 2
+HAVING sum(s.idx_scan) = 0
+ORDER BY 3 DESC
+"""
+
+TOP_STATEMENTS_SQL = """
+SELECT query, calls, total_exec_time, mean_exec_time, rows
+FROM pg_stat_statements
+WHERE query LIKE '%%leads_lead%%' AND dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+ORDER BY total_exec_time DESC
+LIMIT %s
+"""
+
+
+class IndexCandidate(NamedTuple):
+    name: str
+    columns: list[str]
+    conditions: list[str]
+
+    def as_index(self) -> models.Index:
+        fields = [c[:-3] if c.endswith('_id') and c != 'id' else c for c in self.columns]
+        condition = None
+        for name in self.conditions:
+            condition = PARTIAL_CONDITIONS[name] if condition is None else condition & PARTIAL_CONDITIONS[name]
+        return models.Index(fields=fields, name=self.name, condition=condition)
+
+    def create_sql(self) -> str:
+        with connection.schema_editor(collect_sql=True) as editor:
+            return str(self.as_index().create_sql(Lead, editor))
+
+    def model_line(self) -> str:
+        """The Lead.Meta.indexes entry that matches a migration adding this index."""
+        code, _ = MigrationWriter.serialize(self.as_index())
+        return code
+
+
+class Advice(NamedTuple):
+    usage: FilterUsage
+    candidate: IndexCandidate | None
+    covered_by: str | None
+    reason: str | None
+    cost_before: float | None
+    cost_after: float | None
+    size_bytes: int | None
+    method: str
+
+
+def index_name(columns: list[str], conditions: list[str]) -> str:
+    """lead_<abbreviated columns>[_<predicates>], hashed down to Django's 30 character limit."""
+    name = 'lead_' + '_'.join(ABBREVIATIONS[c] for c in columns + conditions)
+    if len(name) > 30:
+        digest = hashlib.md5(name.encode()).hexdigest()[:6]
+        name = f"{name[:23]}_{digest}"
+    return name
+
+
+def candidate_for(usage: FilterUsage) -> tuple[IndexCandidate | None, str | None]:
+    """The btree that serves a filter shape's first page, or (None, why not)."""
+    names = set(usage.filters)
+    if 'q' in names:
+        return None, 'full-text search (served by lead_search_gin)'
+    sort = [s.lstrip('-') for s in usage.sort.split(',') if s]
+    equality = [col for f, col in EQUALITY_COLUMNS.items() if f in names]
+    if any(s not in SORT_COLUMNS for s in sort):
+        # The ORDER BY needs a join, so only the filter columns can use the index
+        sort = []
+    columns = equality + [SORT_COLUMNS[s] for s in sort]
+    conditions = [c for c in PARTIAL_CONDITIONS if c in names]
+    if not equality and not conditions:
+        return None, 'no filter a btree can serve'
+    if not columns:
+        return None, 'sorted through a join; a predicate-only index would not help'
+    return IndexCandidate(index_name(columns, conditions), columns, conditions), None
+
+
+def existing_indexes() -> list[tuple[str, list[str], bool]]:
+    """(name, columns, partial) for every btree on leads_lead."""
+    with connection.cursor() as cur:
+        cur.execute(EXISTING_INDEXES_SQL)
+        return [(name, list(cols), partial) for name, cols, partial in cur.fetchall()]
+
+
+def covering_index(candidate: IndexCandidate, existing) -> str | None:
+    """An existing index with the candidate's equality columns (any order) followed by its sort columns.
+
+    A partial index only counts when it is the one this advisor names for the
+    same columns and conditions: any other predicate may not be implied by
+    the shape's filters, so the planner could not use it.
+    """
+    n = sum(1 for c in candidate.columns if c in EQUALITY_COLUMNS.values())
+    for name, cols, partial in existing:
+        if partial:
+            if name == candidate.name:
+                return name
+            continue
+        if candidate.conditions:
+            continue
+        if set(cols[:n]) == set(candidate.columns[:n]) and cols[n:len(candidate.columns)] == candidate.columns[n:]:
+            return name
+    return None
+
+
+def has_extension(name: str) -> bool:
+    with connection.cursor() as cur:
+        cur.execute('SELECT 1 FROM pg_extension WHERE extname = %s', [name])
+        return cur.fetchone() is not None
+
+
+def sample_queryset(usage: FilterUsage):
+    """The first leads-list page for the shape's most recent filter values."""
+    order = [s for s in usage.sort.split(',') if s]
+    return filter_leads(usage.sample or {}).order_by(*order)[:51]
+
+
+def plan_cost(qs) -> float | None:
+    sql, params = qs.query.sql_with_params()
+    with connection.cursor() as cur:
+        cur.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    try:
+        return float(plan[0]['Plan']['Total Cost'])
+    except (LookupError, TypeError, ValueError):
+        return None
+
+
+def estimated_size(candidate: IndexCandidate) -> int | None:
+    """Index size from pg_stats column widths and the row count the predicate keeps."""
+    rows = table_estimate(Lead)
+    if rows is None:
+        return None
+    if candidate.conditions:
+        rows = plan_estimate(Lead.objects.filter(candidate.as_index().condition)) or 0
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT coalesce(sum(avg_width), 0) FROM pg_stats WHERE tablename = 'leads_lead' AND attname = ANY(%s)",
+            [candidate.columns],
+        )
+        width = cur.fetchone()[0] or 8 * len(candidate.columns)
+    return int(rows * (width + TUPLE_OVERHEAD))
+
+
+def hypothetical(candidate: IndexCandidate, qs) -> tuple[float | None, int | None]:
+    """Plan cost and size with the candidate as a hypopg index; nothing is built."""
+    with connection.cursor() as cur:
+        cur.execute('SELECT indexrelid FROM hypopg_create_index(%s)', [candidate.create_sql()])
+        oid = cur.fetchone()[0]
+        try:
+            cost = plan_cost(qs)
+            cur.execute('SELECT hypopg_relation_size(%s)', [oid])
+            size = cur.fetchone()[0]
+        finally:
+            cur.execute('SELECT hypopg_reset()')
+    return cost, size
+
+
+def measured(candidate: IndexCandidate, qs) -> tuple[float | None, int | None]:
+    """Plan cost and size after really building the candidate, then rolling it back.
+
+    CREATE INDEX holds a SHARE lock on leads_lead (writes wait) while it builds.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cur:
+            cur.execute(candidate.create_sql())
+            cost = plan_cost(qs)
+            cur.execute('SELECT sum(pg_relation_size(relid)) FROM pg_partition_tree(%s::regclass)', [candidate.name])
+            size = cur.fetchone()[0]
+        transaction.set_rollback(True)
+    return cost, size
+
+
+def advise(top: int = 10, min_count: int = 1, measure: bool = False):
+    """Yield Advice for the filter shapes with the most total time spent."""
+    existing = existing_indexes()
+    method = 'hypopg' if has_extension('hypopg') else ('measured' if measure else 'estimated')
+    usages = FilterUsage.objects.filter(count__gte=min_count).order_by('-total_ms')[:top]
+    for usage in usages:
+        qs = sample_queryset(usage)
+        cost_before = plan_cost(qs)
+        candidate, reason = candidate_for(usage)
+        covered_by = covering_index(candidate, existing) if candidate else None
+        cost_after = size = None
+        if candidate and not covered_by:
+            if method == 'hypopg':
+                cost_after, size = hypothetical(candidate, qs)
+            elif method == 'measured':
+                cost_after, size = measured(candidate, qs)
+            else:
+                size = estimated_size(candidate)
+        yield Advice(usage, candidate, covered_by, reason, cost_before, cost_after, size, method)
+
+
+def unused_indexes() -> list[tuple[str, str, int]]:
+    """(table, index, bytes) for non-unique leads indexes never scanned since the statistics were reset."""
+    with connection.cursor() as cur:
+        cur.execute(UNUSED_INDEXES_SQL)
+        return cur.fetchall()
+
+
+def top_statements(limit: int = 5) -> list[tuple]:
+    """The costliest statements touching leads_lead from pg_stat_statements (empty if not installed)."""
+    if not has_extension('pg_stat_statements'):
+        return []
+    with connection.cursor() as cur:
+        cur.execute(TOP_STATEMENTS_SQL, [limit])
+        return cur.fetchall()
+
+
+def write_migration(candidates: list[IndexCandidate]) -> str:
+    """Write a leads migration adding the candidates after the latest one; returns its path."""
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    leaf = loader.graph.leaf_nodes('leads')[0]
+    number = (MigrationAutodetector.parse_number(leaf[1]) or 0) + 1
+    migration = migrations.Migration(f"{number:04d}_advised_indexes", 'leads')
+    migration.dependencies = [leaf]
+    migration.operations = [migrations.AddIndex('lead', c.as_index()) for c in candidates]
+    writer = MigrationWriter(migration)
+    with open(writer.path, 'w') as fh:
+        fh.write(writer.as_string())
+    return writer.path
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from django.db.models.functions import Lower
+
+from .caching import ResultCache
+from .models import Category, City, State
+from .reference import REFERENCE, reference_data
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Lookup kind -> (filter name, (id, name[, state name]) rows)
+LOOKUPS = {
+    'states': ('state', lambda: State.objects.values_list('id', 'name')),
+    'categories': ('category', lambda: Category.objects.values_list('id', 'name')),
+    'cities': ('city', lambda: City.objects.values_list('id', 'name', 'state__name')),
+}
+
+
+def _label(row) -> str:
+    # Cities carry their state so same-named cities stay apart when no state is picked
+    return f'{row[1]}, {row[2]}' if len(row) > 2 else row[1]
+
+
+def lookup_options(kind: str, prefix: str = '', state_id: int | None = None, limit: int = DEFAULT_LIMIT) -> list[list]:
+    """[[id, label], ...] for names starting with prefix (case-insensitive), by name.
+
+    `lower(name) LIKE 'prefix%'` is a range scan of the *_name_prefix_idx
+    text_pattern_ops indexes. Results are cached per reference generation,
+    which ingest and single-row edits of states, cities and categories bump.
+    """
+    prefix, limit = _normalize(kind, prefix, limit)
+    results = ResultCache()
+    key = results.key('lookup', {}, kind, prefix, state_id, limit, generation=REFERENCE)
+    options = results.get('lookup', key)
+    if options is None:
+        options = [[row[0], _label(row)] for row in _options_query(kind, prefix, state_id, limit)]
+        results.set(key, options)
+    return options
+
+
+async def alookup_options(kind: str, prefix: str = '', state_id: int | None = None, limit: int = DEFAULT_LIMIT) -> list[list]:
+    """lookup_options through the async ORM and cache API."""
+    prefix, limit = _normalize(kind, prefix, limit)
+    results = ResultCache()
+    key = await results.akey('lookup', {}, kind, prefix, state_id, limit, generation=REFERENCE)
+    options = await results.aget('lookup', key)
+    if options is None:
+        options = [[row[0], _label(row)] async for row in _options_query(kind, prefix, state_id, limit)]
+        await results.aset(key, options)
+    return options
+
+
+def _normalize(kind: str, prefix: str, limit: int) -> tuple[str, int]:
+    prefix = prefix.strip().lower()
+    if kind == 'cities':
+        # City labels are "Name, State": a picked label must still find its city
+        prefix = prefix.split(',', 1)[0].strip()
+    return prefix, max(1, min(limit, MAX_LIMIT))
+
+
+def _options_query(kind: str, prefix: str, state_id: int | None, limit: int):
+    qs = LOOKUPS[kind][1]()
+    if kind == 'cities' and state_id is not None:
+        qs = qs.filter(state_id=state_id)
+    if prefix:
+        qs = qs.alias(lower_name=Lower('name')).filter(lower_name__startswith=prefix)
+    return qs.order_by('name', 'id')[:limit]
+
+
+def selected_labels(filters: dict) -> dict[str, str]:
+    """Labels of the state, city and category picked in filters, to prefill the pickers."""
+    refs = reference_data()
+    labels = {}
+    for name, objs in (('state', refs.states), ('category', refs.categories)):
+        obj = objs.get(filters.get(name))
+        if obj is not None:
+            labels[name] = str(obj)
+    if filters.get('city') is not None:
+        # Cities are not kept in memory: one small query for the picked one
+        city = City.objects.select_related('state').filter(pk=filters['city']).first()
+        if city is not None:
+            labels['city'] = str(city)
+    return labels
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from leads.index_advisor import advise, top_statements, unused_indexes, write_migration
+from leads.models import FilterUsage
+from leads.telemetry import flush
+
+METHOD_NOTES = {
+    'hypopg': 'plan costs with hypothetical (hypopg) indexes',
+    'measured': 'plan costs and sizes from real builds, rolled back',
+    'estimated': 'sizes from pg_stats only; install hypopg or pass --measure for plan costs',
+}
+
+
+def _size(n: int | None) -> str:
+    if n is None:
+        return '?'
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f"{n:,.0f} {unit}" if unit == 'B' else f"{n:,.1f} {unit}"
+        n /= 1024
+
+
+def _cost(c: float | None) -> str:
+    return '?' if c is None else f"{c:,.0f}"
+
+
+class Command(BaseCommand):
+    help = 'Suggest composite/partial indexes for the most expensive leads filter shapes recorded by filter telemetry.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Filter shapes to review, by total time spent')
+        parser.add_argument('--min-count', dest='min_count', type=int, default=1, help='Ignore shapes used fewer times than this')
+        parser.add_argument('--measure', action='store_true', help='Without hypopg, build each index in a rolled-back transaction to measure it (locks writes)')
+        parser.add_argument('--migration', action='store_true', help='Write a migration adding the suggested indexes')
+        parser.add_argument('--statements', type=int, default=5, help='Top leads_lead statements to show from pg_stat_statements')
+        parser.add_argument('--reset', action='store_true', help='Delete the recorded telemetry after reporting')
+
+    def handle(self, *args, **opts):
+        flush()
+        suggested = {}
+        method = None
+        for advice in advise(opts['top'], opts['min_count'], opts['measure']):
+            method = advice.method
+            u = advice.usage
+            self.stdout.write(
+                f"{u.shape}: {u.count} runs, avg {u.avg_ms:.1f} ms, max {u.max_ms:.1f} ms, "
+                f"total {u.total_ms / 1000:.1f} s; plan cost {_cost(advice.cost_before)}"
+            )
+            c = advice.candidate
+            if c is None:
+                self.stdout.write(f"  no index: {advice.reason}")
+            elif advice.covered_by:
+                self.stdout.write(f"  covered by {advice.covered_by}")
+            else:
+                after = f", plan cost {_cost(advice.cost_after)}" if advice.cost_after is not None else ''
+                self.stdout.write(f"  suggest {c.name} ({', '.join(c.columns)})"
+                                  f"{' WHERE ' + ' AND '.join(c.conditions) if c.conditions else ''}: "
+                                  f"~{_size(advice.size_bytes)}{after}")
+                if advice.cost_after is None or advice.cost_before is None or advice.cost_after < advice.cost_before:
+                    suggested.setdefault(c.name, c)
+        if method is None:
+            self.stdout.write('No filter telemetry recorded yet (FILTER_TELEMETRY=1 and browse /leads/ or /api/leads/).')
+        else:
+            self.stdout.write(f"Costs: {METHOD_NOTES[method]}")
+
+        unused = unused_indexes()
+        if unused:
+            self.stdout.write('Indexes never scanned since statistics were reset:')
+            for table, name, size in unused:
+                self.stdout.write(f"  {table}.{name}: {_size(size)}")
+
+        statements = top_statements(opts['statements'])
+        if statements:
+            self.stdout.write('Costliest leads_lead statements (pg_stat_statements):')
+            for query, calls, total_ms, mean_ms, rows in statements:
+                self.stdout.write(f"  {calls} calls, {total_ms / 1000:.1f} s total, {mean_ms:.1f} ms avg, {rows} rows: {' '.join(query.split())[:160]}")
+
+        if suggested and opts['migration']:
+            path = write_migration(list(suggested.values()))
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}. Add to Lead.Meta.indexes:"))
+            for c in suggested.values():
+                self.stdout.write(f"    {c.model_line()},")
+        if opts['reset']:
+            FilterUsage.objects.all().delete()
+        self.stdout.write(self.style.SUCCESS(f"{len(suggested)} indexes suggested."))
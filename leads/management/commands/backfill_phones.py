@@ -0,0 +1,52 @@
+from __future__ import annotations
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from psycopg2.extras import execute_values
+
+from leads.caching import bump_generation
+from leads.models import Lead
+from leads.normalize import normalize_phone
+
+UPDATE_SQL = """
+UPDATE leads_lead l SET phone_normalized = v.phone_normalized, area_code = v.area_code
+FROM (VALUES %s) AS v (id, phone_normalized, area_code)
+WHERE l.id = v.id
+"""
+
+
+class Command(BaseCommand):
+    help = 'Fill Lead.phone_normalized and Lead.area_code from Lead.phone for existing rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=10000, help='Leads read and updated per transaction')
+        parser.add_argument('--all', action='store_true', help='Recompute every lead with a phone, not only those never normalized')
+
+    def handle(self, *args, **opts):
+        batch_size = opts['batch_size']
+        qs = Lead.objects.exclude(phone__isnull=True).exclude(phone='')
+        if not opts['all']:
+            qs = qs.filter(phone_normalized__isnull=True)
+        started = time.monotonic()
+        last_id = 0
+        scanned = updated = 0
+        # Keyset over the primary key: each batch is one index range scan and
+        # its own transaction, so the command can be stopped and rerun at any point
+        while True:
+            rows = list(qs.filter(id__gt=last_id).order_by('id').values_list('id', 'phone')[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            scanned += len(rows)
+            values = [(pk, *normalize_phone(phone)) for pk, phone in rows]
+            values = [v for v in values if v[1] is not None or opts['all']]
+            if values:
+                with transaction.atomic(), connection.cursor() as cur:
+                    execute_values(cur.cursor, UPDATE_SQL, values, template='(%s::bigint, %s::varchar, %s::varchar)', page_size=1000)
+                updated += len(values)
+            rate = scanned / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"  ... {scanned} leads scanned, {updated} updated (up to id {last_id}, {rate:,.0f}/s)")
+        if updated:
+            bump_generation()
+        self.stdout.write(self.style.SUCCESS(f"Phones backfilled: {updated} of {scanned} leads scanned"))
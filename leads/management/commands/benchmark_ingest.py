@@ -0,0 +1,130 @@
+from __future__ import annotations
+import io
+import json
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from leads.management.commands.ingest_local import Command as IngestCommand
+from leads.models import Lead
+from leads.synthetic import generate_dataset
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def peak_rss_mb() -> dict[str, float]:
+    # ru_maxrss is in KiB on Linux
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset, ingest it into a scratch database and report timings as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=20, help='Files to generate')
+        parser.add_argument('--rows', type=int, default=2000, help='Rows per file')
+        parser.add_argument('--dup-ratio', dest='dup_ratio', type=float, default=0.1, help='Share of rows repeating an earlier business')
+        parser.add_argument('--xlsx-ratio', dest='xlsx_ratio', type=float, default=0.1, help='Share of files written as XLSX')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--data-dir', dest='data_dir', type=str, default=None, help='Generate into (and keep) this directory instead of a temporary one')
+        parser.add_argument('--mode', choices=['row', 'bulk'], default='row')
+        parser.add_argument('--engine', choices=['row', 'arrow'], default='row')
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=5000)
+        parser.add_argument('--commit-every', dest='commit_every', type=int, default=5000)
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the scratch database between runs (flushed before ingest)')
+        parser.add_argument('--output', type=str, default=None, help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **opts):
+        with (nullcontext(opts['data_dir']) if opts['data_dir'] else tempfile.TemporaryDirectory(prefix='leads-bench-')) as data_dir:
+            root = Path(data_dir)
+            started = time.monotonic()
+            dataset = generate_dataset(
+                root, files=opts['files'], rows=opts['rows'], dup_ratio=opts['dup_ratio'],
+                xlsx_ratio=opts['xlsx_ratio'], seed=opts['seed'],
+            )
+            dataset['generate_seconds'] = round(time.monotonic() - started, 3)
+            # Generation can be memory hungry too; report it apart from ingest
+            rss_before = peak_rss_mb()
+
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=opts['keepdb'])
+            try:
+                if opts['keepdb']:
+                    call_command('flush', interactive=False, verbosity=0)
+                report = self.run_benchmark(root, opts)
+                report['leads'] = Lead.objects.count()
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=opts['keepdb'])
+
+        report = {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'params': {k: opts[k] for k in (
+                'files', 'rows', 'dup_ratio', 'xlsx_ratio', 'seed',
+                'mode', 'engine', 'workers', 'batch_size', 'commit_every',
+            )},
+            'dataset': dataset,
+            **report,
+            'peak_rss_mb': {'before_ingest': rss_before, 'after_ingest': peak_rss_mb()},
+        }
+        text = json.dumps(report, indent=2)
+        if opts['output']:
+            Path(opts['output']).write_text(text + '\n')
+            self.stderr.write(f"Report written to {opts['output']}")
+        else:
+            self.stdout.write(text)
+
+    def ingest(self, root: Path, opts) -> tuple[IngestCommand, float]:
+        cmd = IngestCommand()
+        log = self.stderr if opts['verbosity'] > 1 else io.StringIO()
+        started = time.monotonic()
+        call_command(
+            cmd, root=str(root), source_name='benchmark',
+            mode=opts['mode'], engine=opts['engine'], workers=opts['workers'],
+            batch_size=opts['batch_size'], commit_every=opts['commit_every'],
+            stdout=log, stderr=log,
+        )
+        return cmd, time.monotonic() - started
+
+    def run_benchmark(self, root: Path, opts) -> dict:
+        cmd, seconds = self.ingest(root, opts)
+        rows = cmd.stats.rows
+        timings = cmd.timings
+        # A second run over unchanged files measures change detection alone
+        rerun, rerun_seconds = self.ingest(root, opts)
+        return {
+            'seconds': round(seconds, 3),
+            'rows': rows,
+            'errors': cmd.stats.errors,
+            'rows_per_second': round(rows / seconds, 1) if seconds else None,
+            'queries': timings.queries,
+            'queries_per_row': round(timings.queries / rows, 4) if rows else None,
+            # Summed over hashing threads and worker processes, so may exceed `seconds`
+            'phase_seconds': {phase: round(s, 3) for phase, s in timings.seconds.items()},
+            'resolver': cmd.resolver.stats,
+            'rerun': {
+                'seconds': round(rerun_seconds, 3),
+                'skipped': rerun.stats.skipped,
+                'queries': rerun.timings.queries,
+            },
+        }
@@ -0,0 +1,92 @@
+from __future__ import annotations
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from leads.caching import bump_generation
+from leads.dedup import BLOCKING_KEYS, cluster_block, iter_blocks, merge_cluster, oversized_blocks
+from leads.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Find duplicate leads by blocking key (domain, phone, name+city), score them and merge them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=str, default=','.join(BLOCKING_KEYS), help=f"Comma-separated passes, in order: {', '.join(BLOCKING_KEYS)}")
+        parser.add_argument('--threshold', type=float, default=0.7, help='Minimum pair similarity to merge (email match = 1.0)')
+        parser.add_argument('--max-block', dest='max_block', type=int, default=200, help='Skip key values shared by more leads than this (too generic to compare)')
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=500, help='Clusters merged per transaction')
+        parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=10000, help='Rows per server-side cursor fetch')
+        parser.add_argument('--dry-run', dest='dry_run', action='store_true', help='Report clusters without merging anything')
+        parser.add_argument('--report', type=str, default=None, help='Write every cluster found to this CSV file (pass, key, lead ids)')
+        parser.add_argument('--skip-rollups', dest='skip_rollups', action='store_true', help='Do not refresh the dashboard rollups after merging')
+
+    def handle(self, *args, **opts):
+        keys = [k.strip() for k in opts['keys'].split(',') if k.strip()]
+        unknown = [k for k in keys if k not in BLOCKING_KEYS]
+        if unknown:
+            raise CommandError(f"Unknown blocking keys: {', '.join(unknown)}")
+        report = open(opts['report'], 'w', newline='') if opts['report'] else None
+        writer = csv.writer(report) if report else None
+        if writer:
+            writer.writerow(['pass', 'key', 'lead_ids'])
+
+        removed = 0
+        try:
+            for key in keys:
+                removed += self.run_pass(key, opts, writer)
+        finally:
+            if report:
+                report.close()
+
+        if opts['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Dry run: nothing was merged.'))
+            return
+        if removed and not opts['skip_rollups']:
+            refresh_rollups()
+        if removed:
+            bump_generation()
+        self.stdout.write(self.style.SUCCESS(f'Dedup complete: {removed} duplicate leads merged away.'))
+
+    def run_pass(self, key: str, opts, writer) -> int:
+        started = time.monotonic()
+        big_blocks, big_leads = oversized_blocks(key, opts['max_block'])
+        blocks = compared = clusters = duplicates = removed = conflicts = 0
+        pending: list[list[int]] = []
+
+        def apply():
+            nonlocal removed, conflicts
+            with transaction.atomic():
+                for ids in pending:
+                    try:
+                        # A merge can still collide with a lead outside the cluster (e.g. a filled-in city)
+                        with transaction.atomic():
+                            removed += merge_cluster(ids)
+                    except IntegrityError:
+                        conflicts += 1
+            pending.clear()
+
+        for value, block in iter_blocks(key, opts['max_block'], opts['chunk_size']):
+            blocks += 1
+            compared += len(block) * (len(block) - 1) // 2
+            for ids in cluster_block(block, opts['threshold']):
+                clusters += 1
+                duplicates += len(ids) - 1
+                if writer:
+                    writer.writerow([key, value, ' '.join(map(str, ids))])
+                if not opts['dry_run']:
+                    pending.append(ids)
+                    if len(pending) >= opts['batch_size']:
+                        apply()
+        if pending:
+            apply()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{key}: {blocks} blocks, {compared} pairs scored, {clusters} clusters, "
+            f"{duplicates} duplicates{'' if opts['dry_run'] else f', {removed} merged, {conflicts} conflicts'}; "
+            f"skipped {big_blocks} oversized blocks ({big_leads} leads) in {elapsed:.1f}s"
+        )
+        return removed
@@ -0,0 +1,44 @@
+from __future__ import annotations
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from leads.export_jobs import claim_next_job, requeue_stale_jobs, run_job
+from leads.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Process queued export jobs, writing gzip CSV or Parquet files to EXPORT_ROOT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty instead of polling')
+        parser.add_argument('--poll', type=float, default=5.0, help='Seconds to wait between polls of an empty queue')
+        parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=None, help='Rows per server-side cursor fetch (default EXPORT_JOB_CHUNK_SIZE)')
+        parser.add_argument('--stale-minutes', dest='stale_minutes', type=int, default=30, help='Requeue running jobs with no progress for this long')
+
+    def handle(self, *args, **opts):
+        chunk_size = opts['chunk_size'] or settings.EXPORT_JOB_CHUNK_SIZE
+        while True:
+            requeued = requeue_stale_jobs(opts['stale_minutes'])
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale export jobs"))
+            job = claim_next_job()
+            if job is None:
+                if opts['once']:
+                    break
+                time.sleep(opts['poll'])
+                continue
+            self.stdout.write(f"Export {job.pk}: {job.format}, filters={job.filters}, ~{job.estimated_rows} rows")
+            started = time.monotonic()
+            pk = job.pk
+            job = run_job(job, chunk_size)
+            elapsed = time.monotonic() - started
+            if job is None:
+                self.stdout.write(self.style.WARNING(f"Export {pk} was requeued while running; its output was discarded"))
+            elif job.status == ExportJob.DONE:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Export {job.pk}: {job.row_count} rows to {job.output_path} in {elapsed:.1f}s"
+                ))
+            else:
+                self.stderr.write(f"Export {job.pk} failed: {job.error}")
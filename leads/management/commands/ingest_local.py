@@ -1,18 +1,29 @@
 from __future__ import annotations
 import csv
 import hashlib
+import multiprocessing
+import os
 import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import islice
 from pathlib import Path
-from urllib.parse import urlparse
 from datetime import datetime
 from django.utils import timezone
 
-from django.core.management.base import BaseCommand
-from django.db import transaction, IntegrityError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction, OperationalError
 from openpyxl import load_workbook
 
-from leads.models import State, City, Category, Source, SourceFile, Lead
-from datetime import date
+from leads.models import Source, SourceFile
+from leads.caching import bump_generation
+from leads.dimensions import DimensionResolver
+from leads.normalize import UnsupportedFile, normalize_row
+from leads.rollups import refresh_rollups
+from leads.reference import bump_reference
+from leads.writers import RowLeadWriter, BulkLeadWriter
 
 
 def file_sha256(path: Path) -> str:
@@ -23,6 +34,10 @@ def file_sha256(path: Path) -> str:
     return h.hexdigest()
 
 
+def file_mtime(stat: os.stat_result) -> datetime:
+    return timezone.make_aware(datetime.fromtimestamp(stat.st_mtime))
+
+
 def parse_city_state_from_filename(name: str):
     m = re.search(r"_in_(.*)\.csv$", name)
     if not m:
@@ -36,41 +51,182 @@ def parse_city_state_from_filename(name: str):
     return city.replace('-', ' ').strip(), state.replace('-', ' ').strip()
 
 
-def normalize_domain(website: str | None, email: str | None) -> str | None:
-    def clean(d: str) -> str:
-        d = d.lower().strip()
-        d = d.split('@')[-1] if '@' in d else d
-        if d.startswith('http://') or d.startswith('https://'):
-            d = urlparse(d).netloc
-        d = d.split('/')[0]
-        if d.startswith('www.'):
-            d = d[4:]
-        return d
-    if website:
-        try:
-            return clean(website)
-        except Exception:
-            pass
-    if email:
-        try:
-            return clean(email)
-        except Exception:
-            pass
-    return None
+def iter_rows_from_csv(p: Path):
+    with p.open(newline='', encoding='utf-8-sig', errors='ignore') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield row
 
 
-def pick(row: dict, keys: list[str]):
-    for k in keys:
-        if k in row and row[k]:
-            return row[k]
+def iter_rows_from_xlsx(p: Path):
+    wb = load_workbook(filename=str(p), read_only=True, data_only=True)
+    ws = wb[wb.sheetnames[0]]
+    header = None
+    for r in ws.iter_rows(values_only=True):
+        if header is None:
+            header = [(str(c).strip() if c is not None else '') for c in r]
+            # ensure unique keys
+            seen = {}
+            for i, h in enumerate(header):
+                if not h:
+                    h = f'col_{i+1}'
+                if h in seen:
+                    seen[h] += 1
+                    h = f"{h}_{seen[h]}"
+                else:
+                    seen[h] = 1
+                header[i] = h
+            continue
+        vals = list(r)
+        row = {}
+        for i, h in enumerate(header):
+            v = vals[i] if i < len(vals) else None
+            row[h] = '' if v is None else v
+        yield row
+
+
+def chunked(iterable, n: int):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, n))
+        if not chunk:
+            return
+        yield chunk
+
+
+def skip_records(batches, n: int):
+    """Drop the first n records from a stream of record batches."""
+    for recs in batches:
+        if n >= len(recs):
+            n -= len(recs)
+            continue
+        yield recs[n:] if n else recs
+        n = 0
+
+
+def iter_rows(path: Path):
+    ext = path.suffix.lower()
+    if ext == '.csv':
+        return iter_rows_from_csv(path)
+    if ext == '.xlsx':
+        return iter_rows_from_xlsx(path)
     return None
 
 
-def clip(value: str | None, n: int) -> str | None:
-    if value is None:
-        return None
-    s = str(value)
-    return s[:n]
+# deadlock_detected, serialization_failure
+RETRYABLE_PGCODES = {'40P01', '40001'}
+MAX_FILE_ATTEMPTS = 3
+
+
+class RunStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.files = 0
+        self.skipped = 0
+        self.errors = 0
+        self.rows = 0
+
+    def add(self, rows, error: bool = False):
+        if error:
+            self.errors += 1
+        elif rows is None:
+            self.skipped += 1
+        else:
+            self.files += 1
+            self.rows += rows
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        return (
+            f"Ingested {self.rows} rows from {self.files} files "
+            f"({self.skipped} unchanged, {self.errors} errors) in {elapsed:.1f}s: {rate:,.0f} rows/s"
+        )
+
+
+class PhaseTimer:
+    """Time spent per ingest phase (hash, parse, resolve, write, rollups) and SQL statements issued."""
+
+    PHASES = ('hash', 'parse', 'resolve', 'write', 'rollups')
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(self.PHASES, 0.0)
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def __call__(self, phase: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - started)
+
+    def add(self, phase: str, seconds: float):
+        # Hashing runs in a thread pool
+        with self._lock:
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+    def iter(self, phase: str, iterable):
+        """Iterate, charging the time spent producing each item to phase."""
+        it = iter(iterable)
+        while True:
+            with self(phase):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def timed(self, phase: str, fn):
+        def wrapper(*args, **kwargs):
+            with self(phase):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def count_queries(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def snapshot(self) -> dict:
+        return {'seconds': dict(self.seconds), 'queries': self.queries}
+
+    def merge(self, snapshot: dict):
+        for phase, seconds in snapshot['seconds'].items():
+            self.add(phase, seconds)
+        self.queries += snapshot['queries']
+
+    def report(self, rows: int) -> str:
+        phases = ', '.join(f'{phase} {s:.1f}s' for phase, s in self.seconds.items())
+        per_row = f'{self.queries / rows:.2f}' if rows else '-'
+        return f"Phases: {phases}; {self.queries} queries ({per_row} per row)"
+
+
+_worker_command = None
+
+
+def _init_worker(mode: str, engine: str, batch_size: int, commit_every: int):
+    global _worker_command
+    connections.close_all()
+    cmd = Command()
+    cmd.mode = mode
+    cmd.engine = engine
+    cmd.batch_size = batch_size
+    cmd.commit_every = commit_every
+    cmd.timings = PhaseTimer()
+    connection.execute_wrappers.append(cmd.timings.count_queries)
+    cmd.resolver = DimensionResolver()
+    _worker_command = cmd
+
+
+def _ingest_in_worker(source: Source, path: str, sha: str):
+    cmd = _worker_command
+    try:
+        rows, error = cmd.run_file(source, Path(path), sha), None
+    except Exception as e:
+        rows, error = None, str(e)
+    return path, rows, error, os.getpid(), cmd.resolver.stats, cmd.timings.snapshot()
 
 
 class Command(BaseCommand):
@@ -81,11 +237,35 @@ class Command(BaseCommand):
         parser.add_argument('--source-name', dest='source_name', type=str, default='local')
         parser.add_argument('--glob', type=str, default='all', help='all (CSV+XLSX) or rglob pattern, or comma-separated patterns')
         parser.add_argument('--limit', type=int, default=None, help='Ingest at most N files (for testing)')
+        parser.add_argument('--mode', choices=['row', 'bulk'], default='row', help='row: per-row ORM upserts; bulk: COPY into a staging table and merge set-wise')
+        parser.add_argument('--engine', choices=['row', 'arrow'], default='row', help='row: csv/openpyxl dicts normalized one at a time; arrow: pyarrow column batches normalized with vectorized kernels')
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=5000, help='Rows staged per COPY/merge in bulk mode')
+        parser.add_argument('--commit-every', dest='commit_every', type=int, default=5000, help='Commit and checkpoint after about N rows of a file (0: one transaction per file)')
+        parser.add_argument('--workers', type=int, default=1, help='Ingest files in N worker processes (one DB connection each)')
+        parser.add_argument('--hash-workers', dest='hash_workers', type=int, default=4, help='Threads hashing files whose size or mtime changed')
+        parser.add_argument('--verify', action='store_true', help='Hash every file instead of trusting an unchanged size and mtime')
+        parser.add_argument('--skip-rollups', dest='skip_rollups', action='store_true', help='Do not refresh the dashboard rollups after ingest')
 
     def handle(self, *args, **opts):
+        run_started = timezone.now()
         root = Path(opts['root'])
         source_name = opts.get('source_name', 'local')
         source, _ = Source.objects.get_or_create(name=source_name, defaults={'type': 'local_folder', 'root_path': str(root)})
+        self.mode = opts.get('mode', 'row')
+        self.engine = opts.get('engine', 'row')
+        if self.engine == 'arrow':
+            try:
+                import leads.arrow_engine  # noqa: F401
+            except ImportError:
+                raise CommandError('pyarrow is not installed. Run: pip install pyarrow')
+        self.batch_size = max(1, opts.get('batch_size') or 5000)
+        self.commit_every = max(0, opts.get('commit_every') or 0)
+        self.resolver = DimensionResolver()
+        self.timings = PhaseTimer()
+        with connection.execute_wrapper(self.timings.count_queries):
+            self.run(source, root, run_started, opts)
+
+    def run(self, source: Source, root: Path, run_started, opts):
 
         # Expand file patterns
         if opts['glob'] == 'all':
@@ -104,15 +284,166 @@ class Command(BaseCommand):
         if opts.get('limit'):
             file_paths = file_paths[: int(opts['limit'])]
         self.stdout.write(f"Found {len(file_paths)} CSV files to consider.")
-        for i, path in enumerate(sorted(file_paths)):
-            try:
-                self.ingest_file(source, path)
-            except Exception as e:
-                self.stderr.write(f"Error processing {path}: {e}")
+        stats = self.stats = RunStats()
+        candidates = self.changed_files(source, file_paths, stats, opts.get('hash_workers') or 1, opts.get('verify'))
+        workers = opts.get('workers') or 1
+        if workers > 1 and len(file_paths) > 1:
+            self.ingest_parallel(source, candidates, workers, stats)
+        else:
+            for path, sha in candidates:
+                try:
+                    stats.add(self.run_file(source, path, sha))
+                except Exception as e:
+                    stats.add(None, error=True)
+                    self.stderr.write(f"Error processing {path}: {e}")
+        self.stdout.write(f"Dimension cache: {self.resolver.report()}")
+        self.stdout.write(stats.summary())
+        if stats.files and not opts.get('skip_rollups'):
+            ingested = SourceFile.objects.filter(source=source, last_ingested_at__gte=run_started).values_list('id', flat=True)
+            with self.timings('rollups'):
+                written = refresh_rollups(source_file_ids=list(ingested))
+            self.stdout.write('Rollups refreshed: ' + ', '.join(f'{dim}={n}' for dim, n in written.items()))
+        if stats.files:
+            self.stdout.write(f"Result cache generation is now {bump_generation()}")
+            # New states, cities and categories were bulk-created: every worker reloads its reference data
+            bump_reference()
+        self.stdout.write(self.timings.report(stats.rows))
         self.stdout.write(self.style.SUCCESS('Ingestion complete.'))
 
-    def ingest_file(self, source: Source, path: Path):
-        sha = file_sha256(path)
+    def changed_files(self, source: Source, file_paths: list[Path], stats: RunStats, hash_workers: int, verify: bool = False):
+        """Yield (path, sha256) for the files that need ingesting, in order.
+
+        Files whose size and mtime match their fully ingested SourceFile row are
+        skipped without being read (unless `verify`). The rest are hashed in a
+        thread pool; a file whose content turns out to be unchanged only gets
+        its size and mtime refreshed.
+        """
+        known = {
+            sf.path: sf for sf in
+            SourceFile.objects.filter(source=source).only('path', 'hash', 'checkpoint_hash', 'size', 'modified_time')
+        }
+        to_hash = []
+        for path in file_paths:
+            stat = path.stat()
+            sf = known.get(str(path))
+            if (not verify and sf is not None and sf.hash and not sf.checkpoint_hash
+                    and sf.size == stat.st_size and sf.modified_time == file_mtime(stat)):
+                stats.add(None)
+                continue
+            to_hash.append((path, stat))
+
+        with ThreadPoolExecutor(max_workers=max(1, hash_workers)) as pool:
+            # map() hashes ahead while earlier files are being ingested
+            hashes = pool.map(self.timings.timed('hash', file_sha256), [p for p, _ in to_hash])
+            for (path, stat), sha in zip(to_hash, hashes):
+                sf = known.get(str(path))
+                if sf is not None and sf.hash == sha:
+                    SourceFile.objects.filter(pk=sf.pk).update(size=stat.st_size, modified_time=file_mtime(stat))
+                    stats.add(None)
+                    continue
+                yield path, sha
+
+    def ingest_parallel(self, source: Source, candidates, workers: int, stats: RunStats):
+        # Finish hashing first: forking while the hash threads run is unsafe
+        candidates = list(candidates)
+        # Forked workers must not inherit open sockets; each opens its own connection
+        connections.close_all()
+        ctx = multiprocessing.get_context('fork')
+        worker_stats = {}
+        worker_timings = {}
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=ctx,
+            initializer=_init_worker, initargs=(self.mode, self.engine, self.batch_size, self.commit_every),
+        ) as pool:
+            futures = [pool.submit(_ingest_in_worker, source, str(p), sha) for p, sha in candidates]
+            for fut in as_completed(futures):
+                path, rows, error, pid, resolver_stats, timings = fut.result()
+                worker_stats[pid] = resolver_stats
+                worker_timings[pid] = timings
+                stats.add(rows, error=bool(error))
+                if error:
+                    self.stderr.write(f"Error processing {path}: {error}")
+        for s in worker_stats.values():
+            self.resolver.merge_stats(s)
+        for t in worker_timings.values():
+            self.timings.merge(t)
+
+    def run_file(self, source: Source, path: Path, sha: str | None = None):
+        """Ingest one file, retrying when it lost a deadlock against another worker."""
+        for attempt in range(1, MAX_FILE_ATTEMPTS + 1):
+            try:
+                return self.ingest_file(source, path, sha)
+            except OperationalError as e:
+                # Ids created inside the rolled back transaction must not stay cached
+                self.resolver.reset()
+                if attempt == MAX_FILE_ATTEMPTS or getattr(e.__cause__, 'pgcode', None) not in RETRYABLE_PGCODES:
+                    raise
+            except Exception:
+                self.resolver.reset()
+                raise
+
+    def iter_records(self, path: Path, engine: str | None = None):
+        """Batches of normalized records from path, or None for unsupported file types."""
+        engine = engine or self.engine
+        ext = path.suffix.lower()
+        if engine == 'arrow' and ext in ('.csv', '.xlsx'):
+            from leads import arrow_engine
+            if ext == '.csv':
+                return arrow_engine.iter_csv_records(path)
+            return arrow_engine.iter_dict_records(iter_rows_from_xlsx(path), self.batch_size)
+        row_iter = iter_rows(path)
+        if row_iter is None:
+            return None
+        return ([normalize_row(row) for row in chunk] for chunk in chunked(row_iter, 1000))
+
+    def write_records(self, sf: SourceFile, batches, category_id, state_id, city_id) -> int:
+        """Write record batches after sf.checkpoint_row, committing every `commit_every` rows.
+
+        After each commit the checkpoint is advanced, both in the database and
+        on sf, so an interrupted file resumes from the last committed row.
+        Without commit_every the whole file is written in one savepoint.
+        """
+        if self.mode == 'bulk':
+            writer = BulkLeadWriter(sf, category_id, state_id, city_id, batch_size=self.batch_size)
+        else:
+            writer = RowLeadWriter(sf, category_id, state_id, city_id)
+        batches = self.timings.iter('parse', skip_records(batches, sf.checkpoint_row))
+        count = first = sf.checkpoint_row
+        started = time.monotonic()
+        done = False
+        while not done:
+            with transaction.atomic():
+                written = 0
+                for recs in batches:
+                    # Resolve city/state ids per batch, fallback to file-level
+                    with self.timings('resolve'):
+                        locations = self.resolver.resolve_locations(recs, state_id, city_id)
+                    with self.timings('write'):
+                        for rec, (st_id, ct_id) in zip(recs, locations):
+                            writer.write(rec, st_id, ct_id)
+                    written += len(recs)
+                    if self.commit_every and written >= self.commit_every:
+                        break
+                else:
+                    done = True
+                with self.timings('write'):
+                    writer.flush()
+                count += written
+                if self.commit_every:
+                    SourceFile.objects.filter(pk=sf.pk).update(checkpoint_row=count)
+            if self.commit_every:
+                sf.checkpoint_row = count
+                if not done:
+                    rate = (count - first) / max(time.monotonic() - started, 1e-6)
+                    self.stdout.write(f"  {Path(sf.path).name}: {count:,} rows committed ({rate:,.0f} rows/s)")
+        with self.timings('write'):
+            writer.close()
+        return count
+
+    def ingest_file(self, source: Source, path: Path, sha: str | None = None):
+        if not sha:
+            with self.timings('hash'):
+                sha = file_sha256(path)
         stat = path.stat()
 
         # Category = parent directory name relative to root (handles nested datasets)
@@ -123,187 +454,56 @@ class Command(BaseCommand):
         except Exception:
             category_name = path.parent.name
         city_name, state_name = parse_city_state_from_filename(path.name)
-        category, _ = Category.objects.get_or_create(name=category_name)
-        state = None
-        city = None
-        if state_name:
-            state, _ = State.objects.get_or_create(name=state_name)
-        if state and city_name:
-            city, _ = City.objects.get_or_create(name=city_name.replace('_', ' '), state=state)
+        with self.timings('resolve'):
+            category_id = self.resolver.category_id(category_name)
+            state_id = self.resolver.state_id(state_name)
+            city_id = self.resolver.city_id(city_name.replace('_', ' '), state_id) if city_name else None
 
+        mtime = file_mtime(stat)
+        # The hash is only recorded once every row is committed, so a file that
+        # failed (or was interrupted) half-way is never mistaken for unchanged
         sf, created = SourceFile.objects.get_or_create(
             source=source, path=str(path),
-            defaults={'hash': sha, 'size': stat.st_size, 'modified_time': timezone.make_aware(datetime.fromtimestamp(stat.st_mtime)), 'category': category, 'state': state, 'city': city}
+            defaults={'hash': '', 'size': stat.st_size, 'modified_time': mtime, 'category_id': category_id, 'state_id': state_id, 'city_id': city_id}
         )
         if not created and sf.hash == sha:
             # No change
-            return
+            return None
 
-        # Update metadata
-        sf.hash = sha
-        sf.size = stat.st_size
-        sf.modified_time = timezone.make_aware(datetime.fromtimestamp(stat.st_mtime))
-        sf.category = category
-        sf.state = state
-        sf.city = city
-        sf.save()
-
-        def iter_rows_from_csv(p: Path):
-            with p.open(newline='', encoding='utf-8-sig', errors='ignore') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    yield row
-
-        def iter_rows_from_xlsx(p: Path):
-            wb = load_workbook(filename=str(p), read_only=True, data_only=True)
-            ws = wb[wb.sheetnames[0]]
-            header = None
-            for r in ws.iter_rows(values_only=True):
-                if header is None:
-                    header = [(str(c).strip() if c is not None else '') for c in r]
-                    # ensure unique keys
-                    seen = {}
-                    for i, h in enumerate(header):
-                        if not h:
-                            h = f'col_{i+1}'
-                        if h in seen:
-                            seen[h] += 1
-                            h = f"{h}_{seen[h]}"
-                        else:
-                            seen[h] = 1
-                        header[i] = h
-                    continue
-                vals = list(r)
-                row = {}
-                for i, h in enumerate(header):
-                    v = vals[i] if i < len(vals) else None
-                    row[h] = '' if v is None else v
-                yield row
+        batches = self.iter_records(path)
+        if batches is None:
+            return None
 
-        ext = path.suffix.lower()
-        if ext == '.csv':
-            row_iter = iter_rows_from_csv(path)
-        elif ext == '.xlsx':
-            row_iter = iter_rows_from_xlsx(path)
-        else:
-            return
+        # The same file version was interrupted part-way: continue after its last commit
+        if sf.checkpoint_hash != sha:
+            sf.checkpoint_row = 0
+        elif sf.checkpoint_row:
+            self.stdout.write(f"  {path.name}: resuming after row {sf.checkpoint_row:,}")
 
-        count = 0
-        with transaction.atomic():
-            for row in row_iter:
-                business_name = clip(pick(row, ['Name', 'Company', 'Business Name', 'Full Name']) or 'Unknown', 255)
-                website = clip(pick(row, ['Website', 'Company Website']), 255)
-                email = clip(pick(row, ['Company Email', 'Work Email #1', 'Direct Email #1']), 255)
-                phone = clip(pick(row, ['Phone', 'Company Phone', 'Phone #1']), 100)
-                address = pick(row, ['Address', 'Location'])
-                domain = normalize_domain(website, email)
-
-                # Attempt to enrich city/state from row if file-level parsing failed
-                row_city, row_state = None, None
-                q_val = row.get('Query') or ''
-                if q_val:
-                    q_val = q_val.replace('_', ' ')
-                    m = re.search(r" in (.*)", q_val)
-                    if m:
-                        tail = m.group(1).strip()
-                        parts = tail.split()
-                        if len(parts) >= 2:
-                            row_state = parts[-1]
-                            row_city = ' '.join(parts[:-1])
-                if not row_city and row.get('City'):
-                    row_city = row.get('City')
-                if not row_state and row.get('State'):
-                    row_state = row.get('State')
-
-                # Resolve city/state objects, fallback to file-level
-                st = state
-                ct = city
-                if row_state:
-                    st, _ = State.objects.get_or_create(name=str(row_state))
-                if st and row_city:
-                    ct, _ = City.objects.get_or_create(name=str(row_city), state=st)
-
-                # Simple quality score heuristic
-                score = 0
-                if email:
-                    score += 40
-                if website:
-                    score += 30
-                if phone:
-                    score += 20
-                if row.get('Rating'):
-                    try:
-                        score += min(int(float(row['Rating']) * 2), 10)
-                    except Exception:
-                        pass
-
-                # Upsert by email or domain+geo
-                obj = None
-                if email:
-                    obj = Lead.objects.filter(email__iexact=email).first()
-                if not obj and domain and city and state:
-                    obj = Lead.objects.filter(domain__iexact=domain, city=city, state=state).first()
-
-                if obj:
-                    # Update minimal fields and last_seen
-                    obj.business_name = business_name
-                    obj.website = website or obj.website
-                    obj.email = email or obj.email
-                    obj.phone = phone or obj.phone
-                    obj.address = address or obj.address
-                    obj.category = obj.category or category
-                    obj.state = obj.state or st
-                    obj.city = obj.city or ct
-                    obj.domain = obj.domain or domain
-                    obj.quality_score = max(obj.quality_score, score)
-                    obj.source_file = sf
-                    obj.save()
-                else:
-                    try:
-                        # Ensure JSON serializable 'extra'
-                        safe_extra = {}
-                        for k, v in row.items():
-                            if isinstance(v, (datetime, date)):
-                                safe_extra[k] = v.isoformat()
-                            else:
-                                safe_extra[k] = v
-                        Lead.objects.create(
-                                business_name=business_name,
-                                website=website,
-                                email=email,
-                                phone=phone,
-                                address=address,
-                                category=category,
-                                state=st,
-                                city=ct,
-                                domain=domain,
-                                quality_score=score,
-                                extra=safe_extra,
-                                source_file=sf,
-                        )
-                    except IntegrityError:
-                        # If unique constraint triggers, fetch existing and update
-                        existing = None
-                        if domain and st and ct:
-                            existing = Lead.objects.filter(domain__iexact=domain, state=st, city=ct).first()
-                        if not existing and email:
-                            existing = Lead.objects.filter(email__iexact=email).first()
-                        if existing:
-                            existing.business_name = business_name or existing.business_name
-                            existing.website = website or existing.website
-                            existing.email = email or existing.email
-                            existing.phone = phone or existing.phone
-                            existing.address = address or existing.address
-                            existing.category = existing.category or category
-                            existing.state = existing.state or st
-                            existing.city = existing.city or ct
-                            existing.domain = existing.domain or domain
-                            existing.quality_score = max(existing.quality_score, score)
-                            existing.source_file = sf
-                            existing.save()
-                count += 1
-
-        sf.row_count = count
-        sf.last_ingested_at = timezone.now()
-        sf.save()
-        return
+        with transaction.atomic() if not self.commit_every else nullcontext():
+            # Update metadata
+            sf.checkpoint_hash = sha
+            sf.size = stat.st_size
+            sf.modified_time = mtime
+            sf.category_id = category_id
+            sf.state_id = state_id
+            sf.city_id = city_id
+            sf.save()
+
+            try:
+                count = self.write_records(sf, batches, category_id, state_id, city_id)
+            except UnsupportedFile as e:
+                # The uncommitted part was rolled back; the row engine yields the same
+                # records, so it carries on from the checkpoint
+                self.stderr.write(f"{e}; using the row engine for this file")
+                self.resolver.reset()
+                batches = self.iter_records(path, engine='row')
+                count = self.write_records(sf, batches, category_id, state_id, city_id)
+
+            sf.hash = sha
+            sf.checkpoint_hash = ''
+            sf.checkpoint_row = 0
+            sf.row_count = count
+            sf.last_ingested_at = timezone.now()
+            sf.save()
+        return count
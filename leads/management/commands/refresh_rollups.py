@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from leads.caching import bump_generation
+from leads.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-category/state/city lead count summaries used by the dashboard.'
+
+    def handle(self, *args, **opts):
+        written = refresh_rollups()
+        # Facets may have been answered from the old rollups
+        bump_generation()
+        self.stdout.write(self.style.SUCCESS(
+            'Rollups refreshed: ' + ', '.join(f'{dim}={n}' for dim, n in written.items())
+        ))
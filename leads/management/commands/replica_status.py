@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from leads.routing import PRIMARY, REPLICA, replica_status
+
+
+class Command(BaseCommand):
+    help = 'Show whether the read replica is configured, reachable and within REPLICA_MAX_LAG_SECONDS.'
+
+    def handle(self, *args, **opts):
+        if REPLICA not in settings.DATABASES:
+            self.stdout.write('No replica configured (set REPLICA_DATABASE_URL); all reads use the primary.')
+            return
+        healthy, lag = replica_status(force=True)
+        if not healthy:
+            self.stdout.write(self.style.ERROR(f"Replica unreachable; read-only views use {PRIMARY}."))
+            return
+        within = lag <= settings.REPLICA_MAX_LAG_SECONDS
+        self.stdout.write(f"Replica lag {lag:.1f}s (max {settings.REPLICA_MAX_LAG_SECONDS:g}s).")
+        alias = REPLICA if within else PRIMARY
+        style = self.style.SUCCESS if within else self.style.WARNING
+        self.stdout.write(style(f"Read-only views use {alias}."))
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from leads.caching import ResultCache, bump_generation, current_generation
+
+
+class Command(BaseCommand):
+    help = 'Show result cache hit/miss counts and the data generation, or invalidate cached results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bump', action='store_true', help='Start a new data generation (drops every cached result)')
+        parser.add_argument('--reset-stats', action='store_true', help='Zero the hit/miss counters of every process')
+
+    def handle(self, *args, **opts):
+        results = ResultCache()
+        if opts['bump']:
+            self.stdout.write(f"Generation bumped to {bump_generation()}")
+        if opts['reset_stats']:
+            results.reset_stats()
+        self.stdout.write(f"Generation: {current_generation()}")
+        self.stdout.write(
+            f"Hits and misses of all workers, as of their last write (every {settings.RESULT_CACHE_STATS_FLUSH_SECONDS:g}s):"
+        )
+        for kind, s in results.stats().items():
+            total = s['hits'] + s['misses']
+            ratio = s['hits'] / total if total else 0.0
+            self.stdout.write(f"{kind}: {s['hits']} hits / {s['misses']} misses ({ratio:.0%} hit rate)")
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0004_add_indexes_again'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['business_name', 'id'], name='lead_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['quality_score', 'id'], name='lead_score_id_idx'),
+        ),
+    ]
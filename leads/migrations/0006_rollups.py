@@ -0,0 +1,57 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryRollup',
+            fields=[
+                ('lead_count', models.BigIntegerField(default=0)),
+                ('email_count', models.BigIntegerField(default=0)),
+                ('website_count', models.BigIntegerField(default=0)),
+                ('phone_count', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='leads.category')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StateRollup',
+            fields=[
+                ('lead_count', models.BigIntegerField(default=0)),
+                ('email_count', models.BigIntegerField(default=0)),
+                ('website_count', models.BigIntegerField(default=0)),
+                ('phone_count', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('state', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='leads.state')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='CityRollup',
+            fields=[
+                ('lead_count', models.BigIntegerField(default=0)),
+                ('email_count', models.BigIntegerField(default=0)),
+                ('website_count', models.BigIntegerField(default=0)),
+                ('phone_count', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('city', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='leads.city')),
+                ('state', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='city_rollups', to='leads.state')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
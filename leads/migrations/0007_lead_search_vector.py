@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:44
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.fields.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0006_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('business_name', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector('domain', 'email', config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), '||', django.contrib.postgres.search.SearchVector('address', django.db.models.fields.json.KeyTextTransform('Query', 'extra'), django.db.models.fields.json.KeyTextTransform('Full Name', 'extra'), config='simple', weight='C'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='lead_search_gin'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0008_data_generation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcefile',
+            name='checkpoint_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='sourcefile',
+            name='checkpoint_row',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0009_sourcefile_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filters', models.JSONField(blank=True, default=dict)),
+                ('sort', models.JSONField(blank=True, default=list)),
+                ('format', models.CharField(choices=[('csv.gz', 'Gzip CSV'), ('parquet', 'Parquet')], default='csv.gz', max_length=10)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='queued', max_length=10)),
+                ('estimated_rows', models.BigIntegerField(blank=True, null=True)),
+                ('row_count', models.BigIntegerField(default=0)),
+                ('output_path', models.TextField(blank=True, default='')),
+                ('error', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0010_export_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='area_code',
+            field=models.CharField(blank=True, max_length=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='phone_normalized',
+            field=models.CharField(blank=True, max_length=16, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['phone_normalized'], name='lead_phone_norm_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['area_code'], name='lead_area_code_idx'),
+        ),
+    ]
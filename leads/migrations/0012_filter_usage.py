@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0011_lead_phone_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilterUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shape', models.CharField(max_length=255, unique=True)),
+                ('filters', models.JSONField(blank=True, default=list)),
+                ('sort', models.CharField(max_length=100)),
+                ('sample', models.JSONField(blank=True, default=dict)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,171 @@
+# Rebuilds leads_lead as a table hash-partitioned by state_id.
+#
+# A state's leads all land in one partition, so state-filtered queries prune
+# to it and an ingest of one state's files only writes that partition and its
+# indexes. Postgres requires the partition key in every unique index and in
+# the primary key, and state_id is nullable, so neither the primary key on id
+# nor the unique index on lower(email) can stay on leads_lead. Instead:
+#   - leads_lead_key holds one (id, lower(email)) row per lead, with id as its
+#     primary key and email_lower unique. Triggers on leads_lead keep it in
+#     step, so a duplicate id or an email already used in any state fails the
+#     write with a unique violation, as the old indexes did,
+#   - leadtag.lead_id references leads_lead_key(id) (deferred, so a lead whose
+#     state is filled in may move partitions),
+#   - emails are also unique per state (NULLS NOT DISTINCT, PostgreSQL 15+):
+#     the bulk writer's ON CONFLICT arbiter.
+# Rows are copied in one transaction with the table locked: run it in a
+# maintenance window on large databases.
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+PARTITIONS = 16
+
+EMAIL_UNIQUE = {
+    'uniq_lead_email_lower': 'CREATE UNIQUE INDEX uniq_lead_email_lower ON leads_lead (lower(email)) WHERE email IS NOT NULL',
+    'uniq_lead_email_state': (
+        'CREATE UNIQUE INDEX uniq_lead_email_state ON leads_lead (lower(email), state_id) '
+        'NULLS NOT DISTINCT WHERE email IS NOT NULL'
+    ),
+}
+
+KEY_TABLE = [
+    'CREATE TABLE leads_lead_key (id bigint PRIMARY KEY, email_lower varchar(255) UNIQUE)',
+    'INSERT INTO leads_lead_key (id, email_lower) SELECT id, lower(email) FROM leads_lead',
+    """
+    CREATE FUNCTION leads_lead_key_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            DELETE FROM leads_lead_key;
+        ELSIF TG_OP = 'DELETE' THEN
+            DELETE FROM leads_lead_key WHERE id = OLD.id;
+        ELSIF TG_OP = 'UPDATE' THEN
+            UPDATE leads_lead_key SET email_lower = lower(NEW.email) WHERE id = NEW.id;
+        ELSE
+            INSERT INTO leads_lead_key (id, email_lower) VALUES (NEW.id, lower(NEW.email));
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    # AFTER triggers: an INSERT ... ON CONFLICT DO UPDATE only fires the UPDATE one.
+    # An update that moves a lead to another partition fires DELETE then INSERT.
+    'CREATE TRIGGER leads_lead_key_insert AFTER INSERT ON leads_lead '
+    'FOR EACH ROW EXECUTE FUNCTION leads_lead_key_sync()',
+    'CREATE TRIGGER leads_lead_key_update AFTER UPDATE OF email ON leads_lead '
+    'FOR EACH ROW WHEN (lower(OLD.email) IS DISTINCT FROM lower(NEW.email)) EXECUTE FUNCTION leads_lead_key_sync()',
+    'CREATE TRIGGER leads_lead_key_delete AFTER DELETE ON leads_lead '
+    'FOR EACH ROW EXECUTE FUNCTION leads_lead_key_sync()',
+    'CREATE TRIGGER leads_lead_key_truncate AFTER TRUNCATE ON leads_lead '
+    'FOR EACH STATEMENT EXECUTE FUNCTION leads_lead_key_sync()',
+    'ALTER TABLE leads_leadtag ADD CONSTRAINT leadtag_lead_key_fk FOREIGN KEY (lead_id) '
+    'REFERENCES leads_lead_key (id) DEFERRABLE INITIALLY DEFERRED',
+]
+
+
+def rebuild_leads(schema_editor, partitions: int | None):
+    """Recreate leads_lead (partitioned when `partitions` is set), keeping its rows, indexes and FKs."""
+    partitioned = partitions is not None
+    with schema_editor.connection.cursor() as cur:
+        cur.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = 'leads_lead'"
+        )
+        indexes = cur.fetchall()
+        cur.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'leads_lead'::regclass AND contype = 'f'"
+        )
+        foreign_keys = cur.fetchall()
+        cur.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = 'leads_lead' AND is_generated = 'NEVER' "
+            "ORDER BY ordinal_position"
+        )
+        columns = ', '.join(f'"{c}"' for (c,) in cur.fetchall())
+
+    sql = [
+        'LOCK TABLE leads_lead IN ACCESS EXCLUSIVE MODE',
+        # Its triggers go with the old table, renamed and dropped below
+        'ALTER TABLE leads_leadtag DROP CONSTRAINT IF EXISTS leadtag_lead_key_fk',
+        'ALTER TABLE leads_lead RENAME TO leads_lead_old',
+        'CREATE TABLE leads_lead (LIKE leads_lead_old INCLUDING DEFAULTS INCLUDING GENERATED)'
+        + (' PARTITION BY HASH (state_id)' if partitioned else ''),
+        # The id default belongs to a sequence owned by the old table; a new one is attached below
+        'ALTER TABLE leads_lead ALTER COLUMN id DROP DEFAULT',
+    ]
+    if partitioned:
+        sql += [
+            f'CREATE TABLE leads_lead_p{i} PARTITION OF leads_lead FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})'
+            for i in range(partitions)
+        ]
+    sql += [
+        f'INSERT INTO leads_lead ({columns}) SELECT {columns} FROM leads_lead_old',
+        'DROP TABLE leads_lead_old',
+    ]
+    if partitioned:
+        sql += [
+            'CREATE SEQUENCE leads_lead_id_seq OWNED BY leads_lead.id',
+            "ALTER TABLE leads_lead ALTER COLUMN id SET DEFAULT nextval('leads_lead_id_seq')",
+            'CREATE INDEX leads_lead_id_idx ON leads_lead (id)',
+            *KEY_TABLE,
+        ]
+    else:
+        sql += [
+            'ALTER TABLE leads_lead ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY',
+            'ALTER TABLE leads_lead ADD CONSTRAINT leads_lead_pkey PRIMARY KEY (id)',
+            'DROP TABLE IF EXISTS leads_lead_key',
+            'DROP FUNCTION IF EXISTS leads_lead_key_sync()',
+        ]
+    sql.append("SELECT setval(pg_get_serial_sequence('leads_lead', 'id'), coalesce(max(id), 0) + 1, false) FROM leads_lead")
+
+    # Indexes are built after the copy: one sorted build per index (and partition)
+    email_unique = 'uniq_lead_email_state' if partitioned else 'uniq_lead_email_lower'
+    for name, definition in indexes:
+        if name in ('leads_lead_pkey', 'leads_lead_id_idx'):
+            continue
+        sql.append(EMAIL_UNIQUE[email_unique] if name in EMAIL_UNIQUE else definition.replace(' ON ONLY ', ' ON '))
+    sql += [f'ALTER TABLE leads_lead ADD CONSTRAINT {name} {definition}' for name, definition in foreign_keys]
+    # Autovacuum never analyzes a partitioned parent; the planner's whole-table estimates need it once
+    sql.append('ANALYZE leads_lead')
+
+    for statement in sql:
+        schema_editor.execute(statement, params=None)
+
+
+def partition_leads(apps, schema_editor):
+    rebuild_leads(schema_editor, PARTITIONS)
+
+
+def unpartition_leads(apps, schema_editor):
+    rebuild_leads(schema_editor, None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0012_filter_usage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leadtag',
+            name='lead',
+            field=models.ForeignKey(db_constraint=False, on_delete=models.deletion.CASCADE, to='leads.lead'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveConstraint(
+                    model_name='lead',
+                    name='uniq_lead_email_lower',
+                ),
+                migrations.AddConstraint(
+                    model_name='lead',
+                    constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), models.F('state'), condition=models.Q(('email__isnull', False)), name='uniq_lead_email_state', nulls_distinct=False),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(partition_leads, unpartition_leads),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:36
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0013_partition_leads'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('name'), name='text_pattern_ops'), name='category_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(models.F('state'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('name'), name='text_pattern_ops'), name='city_state_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('name'), name='text_pattern_ops'), name='city_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='state',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('name'), name='text_pattern_ops'), name='state_name_prefix_idx'),
+        ),
+    ]
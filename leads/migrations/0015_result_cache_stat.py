@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0014_lookup_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultCacheStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20, unique=True)),
+                ('hits', models.BigIntegerField(default=0)),
+                ('misses', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
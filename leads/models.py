@@ -1,13 +1,21 @@
 from __future__ import annotations
 from django.db import models
-from django.db.models import Q
+from django.db.models import F, Q
 from django.db.models.functions import Lower
-from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db.models.fields.json import KeyTextTransform
 
 
 class State(models.Model):
     name = models.CharField(max_length=100, unique=True)
 
+    class Meta:
+        indexes = [
+            # Type-ahead: lower(name) LIKE 'prefix%' (lookups.py)
+            models.Index(OpClass(Lower('name'), name='text_pattern_ops'), name='state_name_prefix_idx'),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
@@ -18,6 +26,10 @@ class City(models.Model):
 
     class Meta:
         unique_together = ('name', 'state')
+        indexes = [
+            models.Index(F('state'), OpClass(Lower('name'), name='text_pattern_ops'), name='city_state_name_prefix_idx'),
+            models.Index(OpClass(Lower('name'), name='text_pattern_ops'), name='city_name_prefix_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name}, {self.state.name}"
@@ -26,6 +38,11 @@ class City(models.Model):
 class Category(models.Model):
     name = models.CharField(max_length=150, unique=True)
 
+    class Meta:
+        indexes = [
+            models.Index(OpClass(Lower('name'), name='text_pattern_ops'), name='category_name_prefix_idx'),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
@@ -55,6 +72,9 @@ class SourceFile(models.Model):
     modified_time = models.DateTimeField(null=True, blank=True)
     row_count = models.IntegerField(default=0)
     last_ingested_at = models.DateTimeField(null=True, blank=True)
+    # Ingest in progress: hash of the file version being loaded and the rows of it committed so far
+    checkpoint_hash = models.CharField(max_length=64, blank=True, default='')
+    checkpoint_row = models.IntegerField(default=0)
 
     class Meta:
         unique_together = ('source', 'path')
@@ -68,6 +88,9 @@ class Lead(models.Model):
     website = models.CharField(max_length=255, blank=True, null=True)
     email = models.CharField(max_length=255, blank=True, null=True)
     phone = models.CharField(max_length=100, blank=True, null=True)
+    # E.164 form of phone and its North American area code (normalize.normalize_phone)
+    phone_normalized = models.CharField(max_length=16, blank=True, null=True)
+    area_code = models.CharField(max_length=3, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     state = models.ForeignKey(State, on_delete=models.SET_NULL, null=True, blank=True, related_name='leads', db_index=True)
     city = models.ForeignKey(City, on_delete=models.SET_NULL, null=True, blank=True, related_name='leads', db_index=True)
@@ -79,12 +102,28 @@ class Lead(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_seen_at = models.DateTimeField(auto_now=True)
+    # Maintained by Postgres; 'simple' config so names, domains and emails are not stemmed
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('business_name', weight='A', config='simple')
+            + SearchVector('domain', 'email', weight='B', config='simple')
+            + SearchVector(
+                'address', KeyTextTransform('Query', 'extra'), KeyTextTransform('Full Name', 'extra'),
+                weight='C', config='simple',
+            )
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
+        # leads_lead is hash-partitioned by state_id (migration 0013), so every
+        # unique index must include state_id. Ids and emails stay unique across
+        # states through the trigger-maintained leads_lead_key table.
         constraints = [
             models.UniqueConstraint(
-                Lower('email'), name='uniq_lead_email_lower',
-                condition=Q(email__isnull=False)
+                Lower('email'), 'state', name='uniq_lead_email_state',
+                condition=Q(email__isnull=False), nulls_distinct=False,
             ),
             models.UniqueConstraint(
                 Lower('domain'), 'city', 'state',
@@ -97,6 +136,13 @@ class Lead(models.Model):
             models.Index(fields=['state'], name='lead_state_idx'),
             models.Index(fields=['city'], name='lead_city_idx'),
             models.Index(fields=['quality_score'], name='lead_score_idx'),
+            # Keyset pagination: one composite (sort column, id) index per direct sort
+            models.Index(fields=['business_name', 'id'], name='lead_name_id_idx'),
+            models.Index(fields=['quality_score', 'id'], name='lead_score_id_idx'),
+            # pattern_ops serves both exact matches and LIKE 'prefix%' scans
+            models.Index(fields=['phone_normalized'], name='lead_phone_norm_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['area_code'], name='lead_area_code_idx'),
+            GinIndex(fields=['search_vector'], name='lead_search_gin'),
             GinIndex(fields=['business_name'], name='lead_biz_trgm', opclasses=['gin_trgm_ops']),
             GinIndex(fields=['domain'], name='lead_domain_trgm', opclasses=['gin_trgm_ops']),
             GinIndex(fields=['email'], name='lead_email_trgm', opclasses=['gin_trgm_ops']),
@@ -114,7 +160,9 @@ class Tag(models.Model):
 
 
 class LeadTag(models.Model):
-    lead = models.ForeignKey(Lead, on_delete=models.CASCADE)
+    # The database FK references leads_lead_key(id) (migration 0013): a partitioned
+    # leads_lead has no unique key on id alone. Cascades run in the ORM.
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, db_constraint=False)
     tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
 
     class Meta:
@@ -128,3 +176,129 @@ class SavedView(models.Model):
 
     def __str__(self) -> str:
         return self.name
+
+
+class RollupBase(models.Model):
+    lead_count = models.BigIntegerField(default=0)
+    email_count = models.BigIntegerField(default=0)
+    website_count = models.BigIntegerField(default=0)
+    phone_count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class CategoryRollup(RollupBase):
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+
+    def __str__(self) -> str:
+        return f"{self.category_id}: {self.lead_count}"
+
+
+class StateRollup(RollupBase):
+    state = models.OneToOneField(State, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+
+    def __str__(self) -> str:
+        return f"{self.state_id}: {self.lead_count}"
+
+
+class CityRollup(RollupBase):
+    city = models.OneToOneField(City, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+    state = models.ForeignKey(State, on_delete=models.CASCADE, related_name='city_rollups')
+
+    def __str__(self) -> str:
+        return f"{self.city_id}: {self.lead_count}"
+
+
+class DataGeneration(models.Model):
+    """Counter bumped whenever a dataset changes; cached results are keyed by it."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.value}"
+
+
+class ResultCacheStat(models.Model):
+    """Result cache hits and misses of one kind, summed over every process (caching.flush_stats)."""
+    kind = models.CharField(max_length=20, unique=True)
+    hits = models.BigIntegerField(default=0)
+    misses = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.kind}: {self.hits}/{self.misses}"
+
+
+class ExportJob(models.Model):
+    """A leads export written to settings.EXPORT_ROOT by the export_worker command."""
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    CSV_GZ, PARQUET = 'csv.gz', 'parquet'
+    FORMAT_CHOICES = (
+        (CSV_GZ, 'Gzip CSV'),
+        (PARQUET, 'Parquet'),
+    )
+    # normalize_filters() output and sort_order() of the request that queued the job
+    filters = models.JSONField(default=dict, blank=True)
+    sort = models.JSONField(default=list, blank=True)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default=CSV_GZ)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    estimated_rows = models.BigIntegerField(null=True, blank=True)
+    row_count = models.BigIntegerField(default=0)
+    output_path = models.TextField(blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Also bumped on every progress update, so stale running jobs can be requeued
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Export {self.pk} ({self.status})"
+
+    @property
+    def filename(self) -> str:
+        return f"leads_export_{self.pk}.{self.format}"
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def progress(self) -> float | None:
+        """Share of the estimated rows written so far, if an estimate exists."""
+        if self.status == self.DONE:
+            return 1.0
+        if not self.estimated_rows:
+            return None
+        return min(self.row_count / self.estimated_rows, 0.99)
+
+
+class FilterUsage(models.Model):
+    """How often one combination of leads filters and sort order ran, and how long it took (telemetry.py)."""
+    # e.g. "category,has_email|business_name,id"
+    shape = models.CharField(max_length=255, unique=True)
+    filters = models.JSONField(default=list, blank=True)
+    sort = models.CharField(max_length=100)
+    # The most recent filter values with this shape, to EXPLAIN in advise_indexes
+    sample = models.JSONField(default=dict, blank=True)
+    count = models.BigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.shape}: {self.count}"
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
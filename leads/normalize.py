@@ -0,0 +1,157 @@
+from __future__ import annotations
+import re
+from datetime import date, datetime
+from urllib.parse import urlparse
+
+# Source columns tried in order for each Lead field; the first non-empty one wins
+NAME_KEYS = ['Name', 'Company', 'Business Name', 'Full Name']
+WEBSITE_KEYS = ['Website', 'Company Website']
+EMAIL_KEYS = ['Company Email', 'Work Email #1', 'Direct Email #1']
+PHONE_KEYS = ['Phone', 'Company Phone', 'Phone #1']
+ADDRESS_KEYS = ['Address', 'Location']
+
+# A trailing extension ("x12", "ext. 12", "#12") is not part of the number
+PHONE_EXTENSION = re.compile(r'(?i)\s*(?:ext\.?|x|#)\s*[0-9]{1,6}\s*$')
+NON_DIGITS = re.compile(r'[^0-9]')
+
+
+class UnsupportedFile(Exception):
+    """An ingest engine cannot read this file exactly like the row engine would."""
+
+
+def normalize_domain(website: str | None, email: str | None) -> str | None:
+    def clean(d: str) -> str:
+        d = d.lower().strip()
+        d = d.split('@')[-1] if '@' in d else d
+        if d.startswith('http://') or d.startswith('https://'):
+            d = urlparse(d).netloc
+        d = d.split('/')[0]
+        if d.startswith('www.'):
+            d = d[4:]
+        return d
+    if website:
+        try:
+            return clean(website)
+        except Exception:
+            pass
+    if email:
+        try:
+            return clean(email)
+        except Exception:
+            pass
+    return None
+
+
+def pick(row: dict, keys: list[str]):
+    for k in keys:
+        if k in row and row[k]:
+            return row[k]
+    return None
+
+
+def clip(value: str | None, n: int) -> str | None:
+    if value is None:
+        return None
+    s = str(value)
+    return s[:n]
+
+
+def normalize_phone(phone: str | None) -> tuple[str | None, str | None]:
+    """(E.164 number, area code) for a source phone value, or (None, None).
+
+    Numbers without a leading + are read as North American: 10 digits, or 11
+    starting with 1. Other +-prefixed numbers of 8-15 digits are kept without
+    an area code.
+    """
+    if not phone:
+        return None, None
+    s = PHONE_EXTENSION.sub('', str(phone).strip())
+    plus = s.startswith('+')
+    digits = NON_DIGITS.sub('', s)
+    if not plus and len(digits) == 10:
+        digits = '1' + digits
+    if len(digits) == 11 and digits.startswith('1'):
+        area_code = digits[1:4]
+        if area_code[0] in '01':
+            return None, None
+        return '+' + digits, area_code
+    if plus and 8 <= len(digits) <= 15:
+        return '+' + digits, None
+    return None, None
+
+
+def parse_row_location(row: dict):
+    """Enrich city/state from the row when file-level parsing is not enough."""
+    row_city, row_state = None, None
+    q_val = row.get('Query') or ''
+    if q_val:
+        q_val = q_val.replace('_', ' ')
+        m = re.search(r" in (.*)", q_val)
+        if m:
+            tail = m.group(1).strip()
+            parts = tail.split()
+            if len(parts) >= 2:
+                row_state = parts[-1]
+                row_city = ' '.join(parts[:-1])
+    if not row_city and row.get('City'):
+        row_city = row.get('City')
+    if not row_state and row.get('State'):
+        row_state = row.get('State')
+    return row_city, row_state
+
+
+def rating_points(rating) -> int:
+    if not rating:
+        return 0
+    try:
+        return min(int(float(rating) * 2), 10)
+    except Exception:
+        return 0
+
+
+def safe_extra(row: dict) -> dict:
+    # Ensure JSON serializable 'extra'
+    extra = {}
+    for k, v in row.items():
+        if isinstance(v, (datetime, date)):
+            extra[k] = v.isoformat()
+        else:
+            extra[k] = v
+    return extra
+
+
+def normalize_row(row: dict) -> dict:
+    """Map a raw source row onto Lead fields (plus the row-level city/state names)."""
+    business_name = clip(pick(row, NAME_KEYS) or 'Unknown', 255)
+    website = clip(pick(row, WEBSITE_KEYS), 255)
+    email = clip(pick(row, EMAIL_KEYS), 255)
+    phone = clip(pick(row, PHONE_KEYS), 100)
+    address = pick(row, ADDRESS_KEYS)
+    domain = normalize_domain(website, email)
+    phone_normalized, area_code = normalize_phone(phone)
+    row_city, row_state = parse_row_location(row)
+
+    # Simple quality score heuristic
+    score = 0
+    if email:
+        score += 40
+    if website:
+        score += 30
+    if phone:
+        score += 20
+    score += rating_points(row.get('Rating'))
+
+    return {
+        'business_name': business_name,
+        'website': website,
+        'email': email,
+        'phone': phone,
+        'phone_normalized': phone_normalized,
+        'area_code': area_code,
+        'address': address,
+        'domain': domain,
+        'quality_score': score,
+        'extra': safe_extra(row),
+        'row_city': row_city,
+        'row_state': row_state,
+    }
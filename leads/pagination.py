@@ -0,0 +1,202 @@
+from __future__ import annotations
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.db.models import F, Func, Q, TextField, Value
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor: str | None, prev_cursor: str | None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(order: list[str], direction: str, values: list) -> str:
+    raw = json.dumps([order, direction, values], separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str | None, order: list[str], model=None):
+    """Return (direction, values), or None for a missing, malformed or foreign cursor.
+
+    With a model, each value must also fit its sort field, so a hand-edited
+    cursor restarts at the first page instead of failing in Postgres.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        cur_order, direction, values = json.loads(raw)
+    except Exception:
+        return None
+    if cur_order != order or direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != len(order):
+        return None
+    if model is not None and not all(_valid_value(model, name, v) for (name, _), v in zip(_parse(order), values)):
+        return None
+    return direction, values
+
+
+def _parse(order: list[str]) -> list[tuple[str, bool]]:
+    return [(o[1:], True) if o.startswith('-') else (o, False) for o in order]
+
+
+def _reverse(order: list[str]) -> list[str]:
+    return [o[1:] if o.startswith('-') else f'-{o}' for o in order]
+
+
+def _field(model, path: str):
+    """The field at the end of path, or None for an annotation."""
+    opts = model._meta
+    field = None
+    for part in path.split('__'):
+        try:
+            field = opts.get_field(part)
+        except Exception:
+            return None
+        if field.is_relation:
+            opts = field.related_model._meta
+    return field.target_field if field.is_relation else field
+
+
+def _valid_value(model, path: str, value) -> bool:
+    if value is None:
+        return _nullable(model, path)
+    if isinstance(value, bool):
+        return False
+    field = _field(model, path)
+    if field is None:
+        # Annotations: the float search rank
+        return isinstance(value, (int, float))
+    internal = field.get_internal_type()
+    if internal.endswith(('IntegerField', 'AutoField')):
+        return isinstance(value, int)
+    if internal in ('FloatField', 'DecimalField'):
+        return isinstance(value, (int, float))
+    # Text, and dates encoded as strings by encode_cursor
+    return isinstance(value, str)
+
+
+def _nullable(model, path: str) -> bool:
+    opts = model._meta
+    for part in path.split('__'):
+        try:
+            field = opts.get_field(part)
+        except Exception:
+            # Annotations (e.g. a search rank) are never null
+            return False
+        if field.null:
+            return True
+        if field.is_relation:
+            opts = field.related_model._meta
+    return False
+
+
+def _value(obj, path: str):
+    if isinstance(obj, dict):
+        return obj.get(path)
+    for part in path.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, part)
+    return obj
+
+
+def _seek(qs, order: list[str], values: list):
+    """Filter qs to rows strictly after `values` in ORDER BY `order`.
+
+    When every key is non-nullable and sorted the same way this is a single
+    row comparison, e.g. (business_name, id) > ('Acme', 42), which Postgres
+    answers with one range scan of the matching composite index. Otherwise it
+    expands into ORs that follow Postgres NULL placement (last for ASC,
+    first for DESC).
+    """
+    fields = _parse(order)
+    directions = {desc for _, desc in fields}
+    if len(directions) == 1 and not any(_nullable(qs.model, name) for name, _ in fields):
+        lhs = Func(*[F(name) for name, _ in fields], function='ROW', output_field=TextField())
+        rhs = Func(*[Value(v) for v in values], function='ROW', output_field=TextField())
+        lookup = 'lt' if directions.pop() else 'gt'
+        return qs.alias(_seek_key=lhs).filter(**{f'_seek_key__{lookup}': rhs})
+
+    conds = []
+    eq = Q()
+    for (name, desc), v in zip(fields, values):
+        if v is None:
+            if desc:
+                conds.append(eq & Q(**{f'{name}__isnull': False}))
+            eq &= Q(**{f'{name}__isnull': True})
+            continue
+        cond = Q(**{f"{name}__{'lt' if desc else 'gt'}": v})
+        if not desc and _nullable(qs.model, name):
+            cond |= Q(**{f'{name}__isnull': True})
+        conds.append(eq & cond)
+        eq &= Q(**{name: v})
+    if not conds:
+        return qs.none()
+    return qs.filter(reduce(or_, conds))
+
+
+def _page_query(qs, order: list[str], cursor: str | None, page_size: int):
+    """(sliced page queryset, direction, cursor values) for one keyset page."""
+    decoded = decode_cursor(cursor, order, qs.model)
+    direction, values = decoded if decoded else ('next', None)
+    if direction == 'prev':
+        page_qs = _seek(qs.order_by(*_reverse(order)), _reverse(order), values)
+    else:
+        page_qs = qs.order_by(*order)
+        if values is not None:
+            page_qs = _seek(page_qs, order, values)
+    return page_qs[: page_size + 1], direction, values
+
+
+def _page(rows: list, order: list[str], direction: str, values, page_size: int) -> KeysetPage:
+    """The KeysetPage for the page_size + 1 rows fetched by _page_query."""
+    if direction == 'prev':
+        has_prev = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = True
+    else:
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_prev = values is not None
+
+    fields = [name for name, _ in _parse(order)]
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(order, 'next', [_value(rows[-1], f) for f in fields])
+    if rows and has_prev:
+        prev_cursor = encode_cursor(order, 'prev', [_value(rows[0], f) for f in fields])
+    return KeysetPage(rows, next_cursor, prev_cursor)
+
+
+def keyset_paginate(qs, order: list[str], cursor: str | None, page_size: int) -> KeysetPage:
+    """Cursor (seek) pagination over `qs` ordered by `order`, which must end in a unique key.
+
+    No COUNT(*) and no OFFSET: every page costs the same index probe no
+    matter how deep it is.
+    """
+    page_qs, direction, values = _page_query(qs, order, cursor, page_size)
+    return _page(list(page_qs), order, direction, values, page_size)
+
+
+async def akeyset_paginate(qs, order: list[str], cursor: str | None, page_size: int) -> KeysetPage:
+    """keyset_paginate, fetching the page with the async ORM."""
+    page_qs, direction, values = _page_query(qs, order, cursor, page_size)
+    return _page([row async for row in page_qs], order, direction, values, page_size)
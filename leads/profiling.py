@@ -0,0 +1,191 @@
+from __future__ import annotations
+import heapq
+import itertools
+import json
+import logging
+import random
+import re
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('leads.requests')
+slow_query_logger = logging.getLogger('leads.slow_queries')
+
+_current: ContextVar[RequestProfile | None] = ContextVar('request_profile', default=None)
+
+SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+SQL_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL with literals and placeholders replaced by ?, so statements differing only in values group together."""
+    sql = SQL_STRING.sub('?', sql.replace('%s', '?'))
+    sql = SQL_NUMBER.sub('?', sql)
+    sql = SQL_LIST.sub('(...)', sql)
+    return ' '.join(sql.split())
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class RequestProfile:
+    """SQL and template timings collected while one request is handled."""
+
+    def __init__(self, keep: int):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.keep = keep
+        # Min-heap of (seconds, seq, sql): the `keep` slowest statements
+        self.slowest: list[tuple[float, int, str]] = []
+        self.slow: list[tuple[float, str]] = []
+        self._seq = itertools.count()
+
+    def record_query(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add_query(sql, time.perf_counter() - started)
+
+    def add_query(self, sql: str, seconds: float):
+        self.queries += 1
+        self.sql_seconds += seconds
+        entry = (seconds, next(self._seq), sql)
+        if len(self.slowest) < self.keep:
+            heapq.heappush(self.slowest, entry)
+        elif self.slowest and seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+        if seconds * 1000 >= settings.SLOW_QUERY_MS:
+            self.slow.append((seconds, sql))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total: float) -> str:
+        return ', '.join([
+            f'db;dur={_ms(self.sql_seconds)};desc="{self.queries} queries"',
+            f'tpl;dur={_ms(self.template_seconds)}',
+            f'total;dur={_ms(total)}',
+        ])
+
+    def summary(self, request, response, view: str | None, total: float) -> dict:
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'total_ms': _ms(total),
+            'db_ms': _ms(self.sql_seconds),
+            'queries': self.queries,
+            'template_ms': _ms(self.template_seconds),
+            'slowest': [
+                {'ms': _ms(seconds), 'sql': normalize_sql(sql)}
+                for seconds, _, sql in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.record_query(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def _profile_connection(sender, connection, **kwargs):
+    # Installed once per connection rather than per request: under ASGI the
+    # async ORM queries on the request's sync thread, through connections the
+    # middleware never sees. The context variable follows it there.
+    if _record_query not in connection.execute_wrappers:
+        # First, so execute_wrapper() blocks that pop() theirs leave it alone
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_seconds += time.perf_counter() - started
+
+
+class ProfiledTemplates(DjangoTemplates):
+    """The Django template backend, with render time added to the current request's profile."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
+
+
+class RequestProfilingMiddleware:
+    """Per-request query count, SQL time, slowest statements and template render time.
+
+    Reported in a Server-Timing header (SERVER_TIMING) and one JSON line on
+    the `leads.requests` logger. Statements slower than SLOW_QUERY_MS go to
+    `leads.slow_queries` with their normalized SQL and view, sampled at
+    SLOW_QUERY_SAMPLE_RATE. Template time includes queries run lazily while
+    rendering; work done while a streaming response is consumed is not
+    covered.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile = RequestProfile(settings.SLOWEST_QUERIES)
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = RequestProfile(settings.SLOWEST_QUERIES)
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, profile)
+
+    def report(self, request, response, profile: RequestProfile):
+        total = profile.elapsed()
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else None
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = profile.server_timing(total)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(profile.summary(request, response, view, total)))
+        for seconds, sql in profile.slow:
+            if random.random() < settings.SLOW_QUERY_SAMPLE_RATE:
+                slow_query_logger.warning(json.dumps({
+                    'view': view, 'path': request.path, 'ms': _ms(seconds), 'sql': normalize_sql(sql),
+                }))
+        return response
@@ -0,0 +1,78 @@
+from __future__ import annotations
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import bump_generation, current_generation
+from .models import Category, City, SavedView, State
+
+REFERENCE = 'reference'
+SAVED_VIEWS = 'saved_views'
+RECENT_SAVED_VIEWS = 10
+
+_lock = threading.Lock()
+_current: ReferenceData | None = None
+# (saved_views generation, the most recent saved views)
+_recent_views: tuple[int, list[SavedView]] | None = None
+
+
+class ReferenceData:
+    """States and categories, loaded once per process and reference generation.
+
+    These tables only change during ingest (or through the admin), so list
+    pages read them from memory instead of the database. Cities are not kept:
+    there can be far too many, and a page only names a few of them.
+    """
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.states = {s.id: s for s in State.objects.all()}
+        self.categories = {c.id: c for c in Category.objects.all()}
+
+
+def reference_data() -> ReferenceData:
+    """The process's ReferenceData, reloaded when another process bumped the reference generation.
+
+    The generation is re-read at most every RESULT_CACHE_GENERATION_TTL
+    seconds, so every worker sees a change within that time.
+    """
+    global _current
+    generation = current_generation(REFERENCE)
+    data = _current
+    if data is None or data.generation != generation:
+        with _lock:
+            if _current is None or _current.generation != generation:
+                _current = ReferenceData(generation)
+            data = _current
+    return data
+
+
+def recent_saved_views() -> list[SavedView]:
+    """The RECENT_SAVED_VIEWS newest saved views, reloaded when the saved_views generation changed."""
+    global _recent_views
+    generation = current_generation(SAVED_VIEWS)
+    recent = _recent_views
+    if recent is None or recent[0] != generation:
+        recent = _recent_views = (generation, list(SavedView.objects.order_by('-created_at')[:RECENT_SAVED_VIEWS]))
+    return recent[1]
+
+
+def bump_reference() -> int:
+    """Make every process reload its reference data."""
+    return bump_generation(REFERENCE)
+
+
+@receiver([post_save, post_delete], sender=State)
+@receiver([post_save, post_delete], sender=City)
+@receiver([post_save, post_delete], sender=Category)
+def _reference_changed(sender, **kwargs):
+    # Single-row edits (admin); ingest creates rows with bulk_create and bumps once at the end
+    transaction.on_commit(bump_reference)
+
+
+@receiver([post_save, post_delete], sender=SavedView)
+def _saved_views_changed(sender, **kwargs):
+    # Not reference data: a new view must not reload states or drop the cached lookups
+    transaction.on_commit(lambda: bump_generation(SAVED_VIEWS))
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Lead, CategoryRollup, StateRollup, CityRollup
+
+COUNT_FIELDS = ['lead_count', 'email_count', 'website_count', 'phone_count']
+
+# (summary model, Lead FK it groups by, extra columns copied onto the summary row)
+ROLLUPS = [
+    (CategoryRollup, 'category', {}),
+    (StateRollup, 'state', {}),
+    (CityRollup, 'city', {'state_id': 'city__state_id'}),
+]
+
+
+def _filled(field: str) -> Q:
+    return Q(**{f'{field}__isnull': False}) & ~Q(**{field: ''})
+
+
+def _grouped(qs, key: str, extra: dict):
+    return qs.values(key, *extra.values()).order_by().annotate(
+        lead_count=Count('id'),
+        email_count=Count('id', filter=_filled('email')),
+        website_count=Count('id', filter=_filled('website')),
+        phone_count=Count('id', filter=_filled('phone')),
+    )
+
+
+def refresh_rollups(source_file_ids=None) -> dict[str, int]:
+    """Recompute the per-category/state/city summary rows.
+
+    With `source_file_ids`, only the dimension values that appear on leads
+    last written by those files are recomputed (the incremental refresh run at
+    the end of ingest_local); otherwise every summary row is rebuilt.
+    Returns the number of summary rows written per dimension.
+    """
+    written = {}
+    with transaction.atomic():
+        for model, dim, extra in ROLLUPS:
+            key = f'{dim}_id'
+            leads = Lead.objects.filter(**{f'{key}__isnull': False})
+            existing = model.objects.all()
+            if source_file_ids is not None:
+                keys = list(
+                    Lead.objects.filter(source_file_id__in=list(source_file_ids), **{f'{key}__isnull': False})
+                    .order_by().values_list(key, flat=True).distinct()
+                )
+                if not keys:
+                    written[dim] = 0
+                    continue
+                leads = leads.filter(**{f'{key}__in': keys})
+                existing = existing.filter(pk__in=keys)
+
+            rows = []
+            for r in _grouped(leads, key, extra).iterator():
+                fields = {f: r[f] for f in COUNT_FIELDS}
+                fields.update({name: r[path] for name, path in extra.items()})
+                rows.append(model(**{key: r[key]}, **fields))
+
+            existing.exclude(pk__in=[getattr(r, key) for r in rows]).delete()
+            model.objects.bulk_create(
+                rows,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=[dim],
+                update_fields=COUNT_FIELDS + list(extra) + ['updated_at'],
+            )
+            written[dim] = len(rows)
+    return written
@@ -0,0 +1,120 @@
+from __future__ import annotations
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+# Set by mark_write(); while present the client's reads stay on the primary
+WROTE_COOKIE = 'leads_wrote'
+
+# Seconds the replica is behind; 0 when it has replayed everything it received (or is not a standby)
+LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+# Alias the current request's reads go to (None: the primary)
+_read_alias: ContextVar[str | None] = ContextVar('leads_read_alias', default=None)
+# (healthy, lag in seconds, monotonic time of the check)
+_health: tuple[bool, float | None, float] | None = None
+
+
+class ReplicaRouter:
+    """Reads go to the alias ReplicaRoutingMiddleware picked for the request; writes and migrations to the primary.
+
+    Outside a request (management commands, the export worker) nothing sets
+    an alias, so everything runs on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, never migrated on its own
+        return db == PRIMARY
+
+
+def replica_read(view):
+    """Mark a read-only view: its queries may be served by the replica."""
+    view.replica_read = True
+    return view
+
+
+def replica_status(force: bool = False) -> tuple[bool, float | None]:
+    """(healthy, lag in seconds) of the replica, re-checked at most every REPLICA_CHECK_SECONDS."""
+    global _health
+    now = time.monotonic()
+    if not force and _health and now - _health[2] < settings.REPLICA_CHECK_SECONDS:
+        return _health[0], _health[1]
+    try:
+        with connections[REPLICA].cursor() as cur:
+            cur.execute(LAG_SQL)
+            lag = float(cur.fetchone()[0])
+    except DatabaseError as exc:
+        logger.warning('Replica unavailable, reading from the primary: %s', exc)
+        connections[REPLICA].close()
+        _health = (False, None, now)
+    else:
+        if lag > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning('Replica is %.1fs behind, reading from the primary', lag)
+        _health = (True, lag, now)
+    return _health[0], _health[1]
+
+
+def read_alias_for(request) -> str:
+    """The alias a read-only view should read from for this request."""
+    if REPLICA not in settings.DATABASES:
+        return PRIMARY
+    if request.COOKIES.get(WROTE_COOKIE):
+        # Read-your-writes: the replica may not have replayed this client's last write yet
+        return PRIMARY
+    healthy, lag = replica_status()
+    if not healthy or lag > settings.REPLICA_MAX_LAG_SECONDS:
+        return PRIMARY
+    return REPLICA
+
+
+def mark_write(response):
+    """Keep this client's reads on the primary for READ_YOUR_WRITES_SECONDS after a write."""
+    response.set_cookie(WROTE_COOKIE, '1', max_age=settings.READ_YOUR_WRITES_SECONDS, httponly=True, samesite='Lax')
+    return response
+
+
+class ReplicaRoutingMiddleware:
+    """Route the reads of views marked with @replica_read to the replica when it is usable."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # Not restored on the way out: a streamed response keeps reading from
+        # the same alias while it is iterated after the view returned.
+        # Under ASGI this returns the coroutine, awaited in this same context.
+        _read_alias.set(None)
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, 'replica_read', False):
+            _read_alias.set(read_alias_for(request))
+        return None
@@ -0,0 +1,77 @@
+from __future__ import annotations
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Greatest
+
+# Queries shorter than this skip the prefix tsquery (which would expand to a
+# large share of the lexicon) and go straight to trigram word similarity
+MIN_PREFIX_LENGTH = 3
+
+# Characters with a meaning in tsquery syntax; the rest is left to the parser
+TSQUERY_SPECIAL = re.compile(r"[&|!():<>*'\\]")
+
+
+def prefix_tsquery(q: str) -> str:
+    """Raw tsquery text matching every whitespace-separated term of q as a prefix."""
+    terms = [TSQUERY_SPECIAL.sub(' ', t).strip() for t in q.split()]
+    return ' & '.join(f"'{t}':*" for t in terms if t)
+
+
+def fts_search(qs, q: str):
+    raw = prefix_tsquery(q)
+    if not raw:
+        return None
+    query = SearchQuery(raw, search_type='raw', config='simple')
+    return qs.filter(search_vector=query).annotate(
+        # ts_rank is real; cast so the value round-trips through keyset cursors exactly
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+    )
+
+
+def trigram_search(qs, q: str):
+    return qs.filter(
+        Q(business_name__trigram_word_similar=q) | Q(domain__trigram_word_similar=q) | Q(email__trigram_word_similar=q)
+    ).annotate(
+        rank=Cast(Greatest(
+            TrigramWordSimilarity(q, 'business_name'),
+            TrigramWordSimilarity(q, 'domain'),
+            TrigramWordSimilarity(q, 'email'),
+        ), FloatField()),
+    )
+
+
+def _has_matches(matched, q: str) -> bool:
+    """Whether the full-text query matches any lead, cached per data generation.
+
+    filter_leads searches before applying the other filters, so the answer
+    only depends on q. Caching it keeps the probe off every page, count and
+    export of a search whose results are already cached.
+    """
+    # caching imports filters, which imports this module
+    from .caching import ResultCache
+    results = ResultCache()
+    key = results.key('search', {}, q)
+    found = results.get('search', key)
+    if found is None:
+        found = matched.exists()
+        results.set(key, found)
+    return found
+
+
+def apply_search(qs, q: str):
+    """Filter qs to leads matching q and annotate each row with a `rank`.
+
+    Uses the stored search_vector (business name, domain, email, address and
+    the Query/Full Name extra keys) with prefix matching on every term. Short
+    queries, and queries the full-text index has no match for (typically
+    misspellings), fall back to trigram word similarity on name, domain and
+    email.
+    """
+    q = q.strip()
+    if len(q) >= MIN_PREFIX_LENGTH:
+        matched = fts_search(qs, q)
+        if matched is not None and _has_matches(matched, q):
+            return matched
+    return trigram_search(qs, q)
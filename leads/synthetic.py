@@ -0,0 +1,114 @@
+from __future__ import annotations
+import csv
+import random
+from pathlib import Path
+
+from openpyxl import Workbook
+
+CATEGORIES = [
+    'Plumbers', 'Dentists', 'Electricians', 'Roofing Contractors', 'Real Estate Agents',
+    'Auto Repair', 'Bakeries', 'Chiropractors', 'Landscapers', 'Accountants',
+]
+CITIES = [
+    ('Austin', 'TX'), ('Dallas', 'TX'), ('Houston', 'TX'), ('Denver', 'CO'), ('Boulder', 'CO'),
+    ('Miami', 'FL'), ('Tampa', 'FL'), ('Seattle', 'WA'), ('Portland', 'OR'), ('San Jose', 'CA'),
+    ('Los Angeles', 'CA'), ('New York', 'NY'), ('Buffalo', 'NY'), ('Chicago', 'IL'), ('Salt Lake City', 'UT'),
+]
+WORDS = [
+    'Acme', 'Blue', 'Summit', 'Liberty', 'Golden', 'Prime', 'Elite', 'Metro', 'Valley', 'Pioneer',
+    'Cedar', 'Harbor', 'Eagle', 'Northside', 'Apex', 'Oak', 'Royal', 'Sunrise', 'Family', 'Precision',
+]
+SUFFIXES = ['LLC', 'Inc', 'Co', 'Group', 'Services', '& Sons', 'Pros', 'Experts']
+STREETS = ['Main St', 'Oak Ave', 'Elm St', 'Park Blvd', 'Lake Dr', 'Hill Rd', '2nd St', 'Broadway']
+
+# Column layouts seen in the real exports
+CSV_HEADER = ['Name', 'Website', 'Company Email', 'Phone', 'Address', 'Query', 'Rating', 'Reviews', 'Category']
+XLSX_HEADER = ['Company', 'Company Website', 'Work Email #1', 'Company Phone', 'Location', 'Query', 'Rating']
+
+
+def _business(rng: random.Random, n: int, category: str, city: str, state: str) -> dict:
+    name = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {category.split()[0]} {rng.choice(SUFFIXES)}"
+    slug = ''.join(ch for ch in name.lower() if ch.isalnum())[:40]
+    domain = f'{slug}{n}.com'
+    return {
+        'name': name,
+        'website': f'https://www.{domain}/' if rng.random() < 0.8 else '',
+        'email': f'info@{domain}' if rng.random() < 0.6 else '',
+        'phone': f'({rng.randint(200, 989)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}' if rng.random() < 0.85 else '',
+        'address': f'{rng.randint(1, 9999)} {rng.choice(STREETS)}, {city}, {state}',
+        'rating': f'{rng.uniform(1, 5):.1f}' if rng.random() < 0.7 else '',
+        'reviews': str(rng.randint(0, 800)),
+    }
+
+
+def generate_dataset(
+    root: Path, files: int = 20, rows: int = 1000, dup_ratio: float = 0.1,
+    xlsx_ratio: float = 0.1, seed: int = 0,
+) -> dict:
+    """Write a synthetic leads dataset laid out like the real one.
+
+    Files go to <root>/<Category>/<category>_in_<City>_<ST>.csv (or .xlsx),
+    one category and city per file. About dup_ratio of the rows repeat a
+    business already written (same domain, possibly in another file), so
+    ingest exercises its merge path. The same seed always produces the same
+    files. Returns counts describing what was written.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    written = []
+    unique = 0
+    duplicates = 0
+    n = 0
+    for i in range(files):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        city, state = CITIES[(i // len(CATEGORIES) + i) % len(CITIES)]
+        xlsx = rng.random() < xlsx_ratio
+        stem = f"{category.lower().replace(' ', '_')}_in_{city.replace(' ', '_')}_{state}"
+        path = root / category / f"{stem}.{'xlsx' if xlsx else 'csv'}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        query = f'{category} in {city} {state}'
+
+        records = []
+        for _ in range(rows):
+            if written and rng.random() < dup_ratio:
+                b = dict(rng.choice(written))
+                # Re-scraped copies often miss a field the first copy had
+                b['phone' if rng.random() < 0.5 else 'rating'] = ''
+                duplicates += 1
+            else:
+                n += 1
+                b = _business(rng, n, category, city, state)
+                # Keep a bounded sample to draw duplicates from
+                if len(written) < 50000:
+                    written.append(b)
+                else:
+                    written[rng.randrange(len(written))] = b
+                unique += 1
+            records.append(b)
+
+        if xlsx:
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet()
+            ws.append(XLSX_HEADER)
+            for b in records:
+                ws.append([
+                    b['name'], b['website'] or None, b['email'] or None, b['phone'] or None,
+                    b['address'], query, float(b['rating']) if b['rating'] else None,
+                ])
+            wb.save(path)
+        else:
+            with path.open('w', newline='', encoding='utf-8') as f:
+                w = csv.writer(f)
+                w.writerow(CSV_HEADER)
+                for b in records:
+                    w.writerow([
+                        b['name'], b['website'], b['email'], b['phone'], b['address'],
+                        query, b['rating'], b['reviews'], category,
+                    ])
+    return {
+        'files': files,
+        'rows': files * rows,
+        'unique_rows': unique,
+        'duplicate_rows': duplicates,
+        'bytes': sum(p.stat().st_size for p in root.rglob('*') if p.is_file()),
+    }
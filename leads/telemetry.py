@@ -0,0 +1,72 @@
+from __future__ import annotations
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+logger = logging.getLogger(__name__)
+
+UPSERT_SQL = """
+INSERT INTO leads_filterusage AS u (shape, filters, sort, sample, count, total_ms, max_ms, last_seen_at)
+VALUES (%s, %s, %s, %s, %s, %s, %s, now())
+ON CONFLICT (shape) DO UPDATE SET
+    sample = EXCLUDED.sample,
+    count = u.count + EXCLUDED.count,
+    total_ms = u.total_ms + EXCLUDED.total_ms,
+    max_ms = GREATEST(u.max_ms, EXCLUDED.max_ms),
+    last_seen_at = now()
+"""
+
+_lock = threading.Lock()
+# shape -> [filter names, sort, sample filters, count, total ms, max ms]
+_pending: dict[str, list] = {}
+_last_flush = time.monotonic()
+
+
+def filter_shape(filters: dict, order: list[str]) -> tuple[str, list[str], str]:
+    """(shape key, filter names, sort) for a filter set: which filters, not their values."""
+    names = sorted(filters)
+    sort = ','.join(order)
+    return f"{','.join(names)}|{sort}", names, sort
+
+
+def record_filter_usage(filters: dict, order: list[str], seconds: float):
+    """Count one use of this filter/sort shape; buffered and written every FILTER_TELEMETRY_FLUSH_SECONDS."""
+    if not settings.FILTER_TELEMETRY:
+        return
+    shape, names, sort = filter_shape(filters, order)
+    ms = seconds * 1000
+    with _lock:
+        entry = _pending.get(shape)
+        if entry is None:
+            _pending[shape] = [names, sort, filters, 1, ms, ms]
+        else:
+            entry[2] = filters
+            entry[3] += 1
+            entry[4] += ms
+            entry[5] = max(entry[5], ms)
+        due = time.monotonic() - _last_flush >= settings.FILTER_TELEMETRY_FLUSH_SECONDS
+    if due:
+        flush()
+
+
+def flush():
+    """Write the buffered counters, one upsert per shape; a failure drops them rather than the request."""
+    global _last_flush
+    with _lock:
+        entries = list(_pending.items())
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not entries:
+        return
+    try:
+        with connection.cursor() as cur:
+            for shape, (names, sort, sample, count, total_ms, max_ms) in entries:
+                cur.execute(UPSERT_SQL, [
+                    shape, json.dumps(names), sort, json.dumps(sample, default=str), count, total_ms, max_ms,
+                ])
+    except DatabaseError:
+        logger.warning('Could not write filter telemetry', exc_info=True)
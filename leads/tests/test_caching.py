@@ -0,0 +1,32 @@
+from django.core.cache import caches
+from django.test import TestCase
+
+from leads.caching import ResultCache, flush_stats
+from leads.models import ResultCacheStat
+
+
+class ResultCacheStatsTests(TestCase):
+    def setUp(self):
+        caches['results'].clear()
+        flush_stats()
+        ResultCacheStat.objects.all().delete()
+
+    def test_counts_are_written_to_the_database_not_the_cache(self):
+        results = ResultCache()
+        key = results.key('page', {'state': 1})
+        results.get('page', key)
+        results.set(key, {'ids': []})
+        results.get('page', key)
+        # Buffered in this process until the flush interval passes
+        self.assertFalse(ResultCacheStat.objects.exists())
+
+        self.assertEqual(results.stats()['page'], {'hits': 1, 'misses': 1})
+        self.assertEqual(ResultCacheStat.objects.get(kind='page').hits, 1)
+        self.assertEqual(len(caches['results']._cache), 1)
+
+    def test_reset_stats(self):
+        results = ResultCache()
+        results.get('count', results.key('count', {}))
+        results.stats()
+        results.reset_stats()
+        self.assertEqual(results.stats()['count'], {'hits': 0, 'misses': 0})
@@ -0,0 +1,68 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from leads.export_jobs import WRITERS, claim_next_job, requeue_stale_jobs, run_job
+from leads.models import ExportJob
+
+
+class StaleClaimTests(TestCase):
+    """A job requeued while its first worker is still running belongs to the worker that claimed it again."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.enterContext(override_settings(EXPORT_ROOT=tmp.name))
+        self.job = ExportJob.objects.create(format=ExportJob.CSV_GZ)
+
+    def _run_with(self, writer):
+        with mock.patch.dict(WRITERS, {ExportJob.CSV_GZ: writer}):
+            return run_job(self.first, chunk_size=10)
+
+    def _reclaim(self):
+        self.assertEqual(requeue_stale_jobs(minutes=-1), 1)
+        self.second = claim_next_job()
+
+    def test_first_worker_stops_at_its_next_progress_update(self):
+        self.first = claim_next_job()
+
+        def writer(qs, part, chunk_size, progress):
+            part.write_text('first')
+            self._reclaim()
+            progress(10)
+            self.fail('progress() should abort a lost claim')
+
+        self.assertIsNone(self._run_with(writer))
+        self.assertEqual(list(self.root.iterdir()), [])
+        job = ExportJob.objects.get(pk=self.job.pk)
+        self.assertEqual((job.status, job.worker), (ExportJob.RUNNING, self.second.worker))
+
+    def test_first_worker_does_not_finish_a_reclaimed_job(self):
+        self.first = claim_next_job()
+
+        def writer(qs, part, chunk_size, progress):
+            part.write_text('first')
+            self._reclaim()
+            return 5
+
+        self.assertIsNone(self._run_with(writer))
+        self.assertEqual(list(self.root.iterdir()), [])
+        self.assertEqual(ExportJob.objects.get(pk=self.job.pk).status, ExportJob.RUNNING)
+
+    def test_part_file_is_named_per_claim(self):
+        self.first = claim_next_job()
+        parts = []
+
+        def writer(qs, part, chunk_size, progress):
+            parts.append(part)
+            part.write_text('rows')
+            progress(1)
+            return 1
+
+        job = self._run_with(writer)
+        self.assertEqual((job.status, job.row_count), (ExportJob.DONE, 1))
+        self.assertEqual(Path(job.output_path).read_text(), 'rows')
+        self.assertIn(self.first.worker.rsplit(':', 1)[1], parts[0].name)
@@ -0,0 +1,21 @@
+from django.core.cache import caches
+from django.test import TestCase
+
+from leads.lookups import lookup_options
+from leads.models import State
+
+
+class LookupCacheTests(TestCase):
+    def setUp(self):
+        caches['results'].clear()
+
+    def test_renamed_state_is_not_served_from_the_cache(self):
+        state = State.objects.create(name='Texas')
+        self.assertEqual(lookup_options('states', 'tex'), [[state.id, 'Texas']])
+
+        state.name = 'Tennessee'
+        # The edit bumps the reference generation when its transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            state.save()
+        self.assertEqual(lookup_options('states', 'tex'), [])
+        self.assertEqual(lookup_options('states', 'ten'), [[state.id, 'Tennessee']])
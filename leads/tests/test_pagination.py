@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+
+from leads.models import Lead
+from leads.pagination import decode_cursor, encode_cursor
+
+ORDER = ['quality_score', 'id']
+
+
+class DecodeCursorTests(SimpleTestCase):
+    def test_valid_cursor_round_trips(self):
+        token = encode_cursor(ORDER, 'next', [5, 42])
+        self.assertEqual(decode_cursor(token, ORDER, Lead), ('next', [5, 42]))
+
+    def test_value_of_the_wrong_type_restarts_at_the_first_page(self):
+        for values in (['abc', 42], [5, '42'], [5, None], [True, 42], [5.5, 42]):
+            with self.subTest(values=values):
+                self.assertIsNone(decode_cursor(encode_cursor(ORDER, 'next', values), ORDER, Lead))
+
+    def test_names_accept_text_or_null_when_nullable(self):
+        order = ['business_name', 'id']
+        self.assertIsNotNone(decode_cursor(encode_cursor(order, 'prev', ['Acme', 1]), order, Lead))
+        self.assertIsNone(decode_cursor(encode_cursor(order, 'prev', [3, 1]), order, Lead))
+        order = ['state__name', 'id']
+        self.assertIsNotNone(decode_cursor(encode_cursor(order, 'next', [None, 1]), order, Lead))
+
+    def test_search_rank_must_be_a_number(self):
+        order = ['-rank', '-id']
+        self.assertIsNotNone(decode_cursor(encode_cursor(order, 'next', [0.25, 7]), order, Lead))
+        self.assertIsNone(decode_cursor(encode_cursor(order, 'next', ['x', 7]), order, Lead))
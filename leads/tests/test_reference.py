@@ -0,0 +1,32 @@
+from django.core.cache import caches
+from django.test import TestCase
+
+from leads.caching import current_generation, flush_stats
+from leads.models import City, Lead, SavedView, State
+from leads.reference import REFERENCE, recent_saved_views
+
+
+class SavedViewGenerationTests(TestCase):
+    def test_saving_a_view_reloads_only_the_saved_views(self):
+        reference = current_generation(REFERENCE)
+        self.assertEqual(recent_saved_views(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            view = SavedView.objects.create(name='Austin pizza', filters={'q': 'pizza'})
+        self.assertEqual(recent_saved_views(), [view])
+        self.assertEqual(current_generation(REFERENCE), reference)
+
+
+class ListPageTests(TestCase):
+    def setUp(self):
+        caches['results'].clear()
+        # Restarts the stats flush interval, so no counter write lands in the counted request
+        flush_stats()
+
+    def test_top_cities_are_named_from_the_cached_facets(self):
+        state = State.objects.create(name='TX')
+        city = City.objects.create(name='Austin', state=state)
+        Lead.objects.create(business_name='Acme', state=state, city=city)
+        response = self.client.get('/leads/')
+        self.assertEqual([name for _, name, _ in response.context['top_cities']], ['Austin'])
+        with self.assertNumQueries(1):
+            self.client.get('/leads/')
@@ -0,0 +1,118 @@
+import threading
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from leads.models import Category, City, Lead, LeadTag, Source, SourceFile, State, Tag
+from leads.writers import BulkLeadWriter, RowLeadWriter
+
+
+def _rec(**values) -> dict:
+    rec = {
+        'business_name': 'Acme', 'website': None, 'email': None, 'phone': None, 'phone_normalized': None,
+        'area_code': None, 'address': None, 'domain': None, 'quality_score': 1, 'extra': {},
+    }
+    rec.update(values)
+    return rec
+
+
+class BulkWriterConcurrencyTests(TransactionTestCase):
+    """Two ingest workers writing leads that share a unique key."""
+
+    def setUp(self):
+        self.state = State.objects.create(name='TX')
+        self.city = City.objects.create(name='Austin', state=self.state)
+        self.category = Category.objects.create(name='Pizza')
+        source = Source.objects.create(name='test')
+        self.source_file = SourceFile.objects.create(source=source, path='pizza.csv', hash='x')
+
+    def _other_worker_commits(self, lead: dict, inserted: threading.Event, commit: threading.Event):
+        try:
+            with transaction.atomic():
+                Lead.objects.create(state=self.state, city=self.city, category=self.category, **lead)
+                inserted.set()
+                commit.wait(10)
+        finally:
+            connection.close()
+
+    def test_flush_merges_lead_committed_by_another_worker_on_the_other_key(self):
+        # The other worker's lead has no email, so this flush's INSERT (arbitrating
+        # on the email index) collides with it on the domain+city+state index.
+        inserted, commit = threading.Event(), threading.Event()
+        other = threading.Thread(target=self._other_worker_commits, args=(
+            {'business_name': 'Acme', 'domain': 'acme.com'}, inserted, commit,
+        ))
+        other.start()
+        self.assertTrue(inserted.wait(10))
+
+        writer = BulkLeadWriter(self.source_file, self.category.id, self.state.id, self.city.id)
+        writer.write(_rec(email='owner@acme.com', domain='acme.com'), self.state.id, self.city.id)
+        # Committed while the INSERT waits on the other worker's row
+        threading.Timer(0.5, commit.set).start()
+        writer.flush()
+        other.join(10)
+
+        leads = list(Lead.objects.filter(domain='acme.com'))
+        self.assertEqual(len(leads), 1)
+        self.assertEqual(leads[0].email, 'owner@acme.com')
+
+    def test_flush_merges_lead_committed_by_another_worker_on_the_same_email(self):
+        inserted, commit = threading.Event(), threading.Event()
+        other = threading.Thread(target=self._other_worker_commits, args=(
+            {'business_name': 'Acme', 'email': 'owner@acme.com'}, inserted, commit,
+        ))
+        other.start()
+        self.assertTrue(inserted.wait(10))
+
+        writer = BulkLeadWriter(self.source_file, self.category.id, self.state.id, self.city.id)
+        writer.write(_rec(email='Owner@acme.com', domain='acme.com', website='https://acme.com'), self.state.id, self.city.id)
+        threading.Timer(0.5, commit.set).start()
+        writer.flush()
+        other.join(10)
+
+        leads = list(Lead.objects.filter(email__iexact='owner@acme.com'))
+        self.assertEqual(len(leads), 1)
+        self.assertEqual((leads[0].domain, leads[0].website), ('acme.com', 'https://acme.com'))
+
+
+
+class LeadKeyTests(TestCase):
+    """leads_lead is partitioned by state; leads_lead_key keeps ids and emails unique across states."""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Pizza')
+        source = Source.objects.create(name='test')
+        self.source_file = SourceFile.objects.create(source=source, path='pizza.csv', hash='x')
+        self.tx, self.ca = State.objects.create(name='TX'), State.objects.create(name='CA')
+        self.lead = Lead.objects.create(business_name='Acme', email='owner@acme.com', state=self.tx)
+
+    def test_email_is_unique_across_states(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Lead.objects.create(business_name='Acme', email='Owner@acme.com', state=self.ca)
+        self.lead.delete()
+        Lead.objects.create(business_name='Acme', email='Owner@acme.com', state=self.ca)
+
+    def test_writers_merge_into_the_lead_of_another_state(self):
+        for writer in (
+            RowLeadWriter(self.source_file, self.category.id, self.ca.id, None),
+            BulkLeadWriter(self.source_file, self.category.id, self.ca.id, None),
+        ):
+            writer.write(_rec(email='Owner@acme.com', website='https://acme.com'), self.ca.id, None)
+            writer.flush()
+        self.assertEqual(list(Lead.objects.values_list('id', 'website')), [(self.lead.id, 'https://acme.com')])
+
+    def test_tags_follow_a_lead_to_another_partition(self):
+        lead = Lead.objects.create(business_name='Acme', email='info@acme.com')
+        LeadTag.objects.create(lead=lead, tag=Tag.objects.create(name='hot'))
+        lead.state = self.ca
+        lead.save()
+        with connection.cursor() as cur:
+            cur.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cur.execute('SELECT email_lower FROM leads_lead_key WHERE id = %s', [lead.id])
+            self.assertEqual(cur.fetchone(), ('info@acme.com',))
+
+    def test_tagged_lead_cannot_be_deleted_behind_the_orm(self):
+        LeadTag.objects.create(lead=self.lead, tag=Tag.objects.create(name='hot'))
+        with self.assertRaises(IntegrityError), transaction.atomic(), connection.cursor() as cur:
+            cur.execute('DELETE FROM leads_lead WHERE id = %s', [self.lead.id])
+            cur.execute('SET CONSTRAINTS ALL IMMEDIATE')
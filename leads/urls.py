@@ -1,10 +1,27 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Under ASGI the slow read views run as coroutines; WSGI keeps the sync ones
+# (an async streaming response would be buffered whole under WSGI)
+if settings.ASYNC_VIEWS:
+    leads_list, leads_export, leads_api, lookup = (
+        views.leads_list_async, views.leads_export_async, views.leads_api_async, views.lookup_async,
+    )
+else:
+    leads_list, leads_export, leads_api, lookup = views.leads_list, views.leads_export, views.leads_api, views.lookup
+
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
-    path('leads/', views.leads_list, name='leads_list'),
-    path('leads/export/', views.leads_export, name='leads_export'),
+    path('leads/', leads_list, name='leads_list'),
+    path('leads/export/', leads_export, name='leads_export'),
+    path('exports/', views.export_jobs, name='export_jobs'),
+    path('exports/new', views.export_create, name='export_create'),
+    path('exports/<int:pk>/download', views.export_download, name='export_download'),
+    path('api/leads/', leads_api, name='leads_api'),
+    path('api/lookup/<str:kind>/', lookup, name='lookup'),
+    path('api/exports/', views.api_export_create, name='api_export_create'),
+    path('api/exports/<int:pk>/', views.api_export_status, name='api_export_status'),
     path('saved-views/save', views.save_view, name='save_view'),
 ]
 
@@ -1,110 +1,291 @@
 from __future__ import annotations
-from django.shortcuts import render, redirect
-from django.http import HttpResponse
-from django.db.models import Q, Count
-from django.core.paginator import Paginator
-import csv
+import time
+from pathlib import Path
 
-from .models import Lead, Category, State, City, SavedView
+from asgiref.sync import sync_to_async
+from django.shortcuts import get_object_or_404, render, redirect
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.db.models import Sum
 
+from .api import MAX_PAGE_SIZE, UnknownFields, aapi_page, api_page, dumps, export_job_payload, parse_fields
+from .export_jobs import enqueue_export
+from .models import Lead, SavedView, CategoryRollup, StateRollup, ExportJob
+from .counting import CountResult, smart_count
+from .caching import acached_count, acached_page, cached_page, cached_count
+from .exporting import agzip_stream, aiter_csv, iter_csv, gzip_stream
+from .filters import filter_leads, normalize_filters, sort_order
+from .facets import compute_facets
+from .lookups import DEFAULT_LIMIT, LOOKUPS, alookup_options, lookup_options, selected_labels
+from .reference import recent_saved_views
+from .routing import mark_write, replica_read
+from .telemetry import record_filter_usage
 
+
+@replica_read
 def dashboard(request):
-    # Accurate counts via ORM
-    total_leads = Lead.objects.count()
-    leads_with_email = Lead.objects.exclude(email__isnull=True).exclude(email__exact='').count()
-    categories = Category.objects.annotate(n=Count('leads')).order_by('-n')[:10]
+    # Read the precomputed summaries (refresh_rollups) instead of aggregating leads_lead
+    totals = CategoryRollup.objects.aggregate(
+        leads=Sum('lead_count'), email=Sum('email_count'),
+        website=Sum('website_count'), phone=Sum('phone_count'),
+    )
+    if totals['leads'] is None:
+        # Rollups never built yet: fall back to estimates
+        total_leads = smart_count(Lead.objects.all())
+        leads_with_email = smart_count(Lead.objects.exclude(email__isnull=True).exclude(email__exact=''))
+    else:
+        total_leads = CountResult(totals['leads'], False)
+        leads_with_email = CountResult(totals['email'], False)
     context = {
         'total_leads': total_leads,
         'leads_with_email': leads_with_email,
-        'top_categories': categories,
+        'totals': totals,
+        'top_categories': CategoryRollup.objects.select_related('category').order_by('-lead_count')[:10],
+        'top_states': StateRollup.objects.select_related('state').order_by('-lead_count')[:10],
     }
     return render(request, 'dashboard.html', context)
 
 
 def _filter_queryset(request):
-    qs = Lead.objects.select_related('city', 'state', 'category')
-    q = request.GET.get('q')
-    state = request.GET.get('state')
-    city = request.GET.get('city')
-    category = request.GET.get('category')
-    has_email = request.GET.get('has_email')
-    has_website = request.GET.get('has_website')
-    sort = request.GET.get('sort', 'business_name')
-
-    if q:
-        qs = qs.filter(Q(business_name__icontains=q) | Q(domain__icontains=q) | Q(email__icontains=q))
-    if state:
-        qs = qs.filter(state_id=state)
-    if city:
-        qs = qs.filter(city_id=city)
-    if category:
-        qs = qs.filter(category_id=category)
-    if has_email in ('1', 'true', 'True'):
-        qs = qs.exclude(email__isnull=True).exclude(email__exact='')
-    if has_website in ('1', 'true', 'True'):
-        qs = qs.exclude(website__isnull=True).exclude(website__exact='')
-
-    if sort in ['business_name', 'quality_score', 'state__name', 'city__name']:
-        qs = qs.order_by(sort)
-    else:
-        qs = qs.order_by('business_name')
+    return filter_leads(normalize_filters(request.GET)).order_by(*_sort_order(request))
 
-    return qs
 
+def _sort_order(request) -> list[str]:
+    return sort_order(request.GET)
 
-def leads_list(request):
-    qs = _filter_queryset(request)
+
+def _querystring(request, **updates) -> str:
+    params = request.GET.copy()
+    params.pop('page', None)
+    for k, v in updates.items():
+        if v is None:
+            params.pop(k, None)
+        else:
+            params[k] = v
+    return params.urlencode()
+
+
+def _page_size(request, default: int, low: int, high: int) -> int:
     try:
-        page_size = int(request.GET.get('page_size', 50))
+        page_size = int(request.GET.get('page_size', default))
     except Exception:
-        page_size = 50
-    page_size = max(10, min(page_size, 200))
+        page_size = default
+    return max(low, min(page_size, high))
 
-    paginator = Paginator(qs, page_size)
-    page = paginator.get_page(request.GET.get('page'))
 
-    # Limit cities to selected state to reduce payload
-    cities_qs = City.objects.order_by('name')
-    if request.GET.get('state'):
-        cities_qs = cities_qs.filter(state_id=request.GET.get('state'))
-    cities_qs = cities_qs[:1000]
+@replica_read
+def leads_list(request):
+    filters = normalize_filters(request.GET)
+    qs = _filter_queryset(request)
+    page_size = _page_size(request, 50, 10, 200)
 
-    context = {
+    # Lead-id pages and counts are served from the result cache until the next ingest;
+    # only cache misses reach the filter telemetry
+    order = _sort_order(request)
+    page = cached_page(qs, filters, order, request.GET.get('cursor'), page_size)
+    total = cached_count(qs, filters)
+
+    facets = compute_facets(qs, filters)
+    return render(request, 'leads_list.html', _list_context(request, filters, page, total, facets))
+
+
+@replica_read
+async def leads_list_async(request):
+    """leads_list for ASGI: the page is fetched with the async ORM; counting, facets and rendering run in the request's sync thread."""
+    filters = normalize_filters(request.GET)
+    # A search may probe the database while the queryset is built (fallback decision, on a cache miss)
+    qs = await sync_to_async(_filter_queryset)(request)
+    page_size = _page_size(request, 50, 10, 200)
+
+    order = _sort_order(request)
+    page = await acached_page(qs, filters, order, request.GET.get('cursor'), page_size)
+    total = await acached_count(qs, filters)
+
+    facets = await sync_to_async(compute_facets)(qs, filters)
+    context = await sync_to_async(_list_context)(request, filters, page, total, facets)
+    return await sync_to_async(render)(request, 'leads_list.html', context)
+
+
+def _list_context(request, filters: dict, page, total, facets: dict) -> dict:
+    # Picker options are loaded by the page from the lookup endpoint; only the selected labels are rendered.
+    # Top-city names are cached with the facets; saved views come from the per-process copy.
+    city_counts = dict(facets['city'])
+
+    return {
         'page': page,
-        'categories': Category.objects.order_by('name'),
-        'states': State.objects.order_by('name'),
-        'cities': cities_qs,
+        'total': total,
+        'next_query': _querystring(request, cursor=page.next_cursor) if page.has_next else None,
+        'prev_query': _querystring(request, cursor=page.prev_cursor) if page.has_previous else None,
+        'selected': selected_labels(filters),
+        'facet_counts': {'category': facets['category'], 'state': facets['state'], 'city': city_counts},
+        'facets': facets,
+        'top_cities': [
+            (_querystring(request, city=str(cid), cursor=None), facets['city_names'].get(cid, ''), n)
+            for cid, n in facets['city']
+        ],
         'params': request.GET,
-        'saved_views': SavedView.objects.order_by('-created_at')[:10],
+        'saved_views': recent_saved_views(),
     }
-    return render(request, 'leads_list.html', context)
 
 
+@replica_read
 def leads_export(request):
-    qs = _filter_queryset(request)[:10000]
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="leads_export.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Business Name', 'Category', 'State', 'City', 'Website', 'Email', 'Phone', 'Domain', 'Score'])
-    for l in qs:
-        writer.writerow([
-            l.business_name,
-            l.category.name if l.category else '',
-            l.state.name if l.state else '',
-            l.city.name if l.city else '',
-            l.website or '',
-            l.email or '',
-            l.phone or '',
-            l.domain or '',
-            l.quality_score,
-        ])
+    qs = _filter_queryset(request)
+    chunks = iter_csv(qs, settings.EXPORT_CHUNK_SIZE)
+    if _gzip_requested(request):
+        return _export_response(gzip_stream(chunks), gzipped=True)
+    return _export_response(chunks, gzipped=False)
+
+
+@replica_read
+async def leads_export_async(request):
+    """leads_export for ASGI: rows are streamed from an async iterator, so a slow client holds no thread."""
+    qs = await sync_to_async(_filter_queryset)(request)
+    chunks = aiter_csv(qs, settings.EXPORT_CHUNK_SIZE)
+    if _gzip_requested(request):
+        return _export_response(agzip_stream(chunks), gzipped=True)
+    return _export_response(chunks, gzipped=False)
+
+
+def _gzip_requested(request) -> bool:
+    return request.GET.get('gzip') in ('1', 'true', 'True')
+
+
+def _export_response(chunks, gzipped: bool) -> StreamingHttpResponse:
+    if gzipped:
+        response = StreamingHttpResponse(chunks, content_type='application/gzip')
+        response['Content-Disposition'] = 'attachment; filename="leads_export.csv.gz"'
+    else:
+        response = StreamingHttpResponse(chunks, content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="leads_export.csv"'
     return response
 
 
+def _json(payload, status: int = 200) -> HttpResponse:
+    return HttpResponse(dumps(payload), status=status, content_type='application/json')
+
+
+@replica_read
+def leads_api(request):
+    """Read-only JSON over the leads list filters: ?fields=a,b&page_size=N&cursor=..."""
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except UnknownFields as e:
+        return _json({'error': f'Unknown fields: {e}'}, status=400)
+    page_size = _page_size(request, 100, 1, MAX_PAGE_SIZE)
+
+    filters = normalize_filters(request.GET)
+    order = _sort_order(request)
+    started = time.monotonic()
+    rows, page = api_page(filter_leads(filters), fields, order, request.GET.get('cursor'), page_size)
+    record_filter_usage(filters, order, time.monotonic() - started)
+    return _json(_api_payload(request, fields, rows, page))
+
+
+@replica_read
+async def leads_api_async(request):
+    """leads_api for ASGI, fetching the page with the async ORM."""
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except UnknownFields as e:
+        return _json({'error': f'Unknown fields: {e}'}, status=400)
+    page_size = _page_size(request, 100, 1, MAX_PAGE_SIZE)
+
+    filters = normalize_filters(request.GET)
+    order = _sort_order(request)
+    started = time.monotonic()
+    qs = await sync_to_async(filter_leads)(filters)
+    rows, page = await aapi_page(qs, fields, order, request.GET.get('cursor'), page_size)
+    await sync_to_async(record_filter_usage)(filters, order, time.monotonic() - started)
+    return _json(_api_payload(request, fields, rows, page))
+
+
+def _api_payload(request, fields: list[str], rows: list[dict], page) -> dict:
+    return {
+        'fields': fields,
+        'results': rows,
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'next': f'{request.path}?{_querystring(request, cursor=page.next_cursor)}' if page.has_next else None,
+    }
+
+
+@replica_read
+def lookup(request, kind: str):
+    """Type-ahead options for the pickers: ?q=<prefix>&limit=N (&state=<id> for cities)."""
+    return _lookup_response(lookup_options(*_lookup_args(request, kind)))
+
+
+@replica_read
+async def lookup_async(request, kind: str):
+    """lookup for ASGI, through the async ORM and cache API."""
+    return _lookup_response(await alookup_options(*_lookup_args(request, kind)))
+
+
+def _lookup_args(request, kind: str) -> tuple:
+    if kind not in LOOKUPS:
+        raise Http404('Unknown lookup')
+    state = str(request.GET.get('state') or '').strip()
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except Exception:
+        limit = DEFAULT_LIMIT
+    return kind, request.GET.get('q') or '', int(state) if state.isdigit() else None, limit
+
+
+def _lookup_response(options: list[list]) -> HttpResponse:
+    response = _json({'results': options})
+    patch_cache_control(response, max_age=settings.LOOKUP_MAX_AGE)
+    return response
+
+
+def _enqueue_from(params) -> ExportJob:
+    return enqueue_export(normalize_filters(params), sort_order(params), params.get('format') or ExportJob.CSV_GZ)
+
+
+@require_POST
+def export_create(request):
+    _enqueue_from(request.POST)
+    return redirect('export_jobs')
+
+
+def export_jobs(request):
+    jobs = list(ExportJob.objects.order_by('-created_at')[:20])
+    return render(request, 'exports.html', {
+        'jobs': jobs,
+        'polling': any(not job.finished for job in jobs),
+    })
+
+
+def export_download(request, pk: int):
+    job = get_object_or_404(ExportJob, pk=pk, status=ExportJob.DONE)
+    path = Path(job.output_path)
+    if not path.is_file():
+        raise Http404('Export file no longer exists')
+    return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
+
+
+# API clients have no CSRF token; the endpoint only queues work
+@csrf_exempt
+@require_POST
+def api_export_create(request):
+    """Queue an export of the leads matching the POSTed (or query string) filters; poll status_url."""
+    job = _enqueue_from(request.POST or request.GET)
+    return _json(export_job_payload(job), status=202)
+
+
+def api_export_status(request, pk: int):
+    return _json(export_job_payload(get_object_or_404(ExportJob, pk=pk)))
+
+
 def save_view(request):
     if request.method == 'POST':
         name = request.POST.get('name') or 'Saved View'
         # store current GET params
         filters = {k: v for k, v in request.POST.items() if k not in {'csrfmiddlewaretoken', 'name'}}
         SavedView.objects.create(name=name, filters=filters)
+        return mark_write(redirect('leads_list'))
     return redirect('leads_list')
@@ -0,0 +1,332 @@
+from __future__ import annotations
+import csv
+import io
+import json
+
+from django.db import connection, transaction, IntegrityError
+
+from .models import Lead
+
+
+class RowLeadWriter:
+    """Upsert leads one row at a time through the ORM (the original ingest path)."""
+
+    def __init__(self, source_file, category_id, state_id, city_id):
+        self.source_file = source_file
+        self.category_id = category_id
+        self.state_id = state_id
+        self.city_id = city_id
+
+    def write(self, rec: dict, st_id, ct_id):
+        email = rec['email']
+        domain = rec['domain']
+
+        # Upsert by email or domain+geo
+        obj = None
+        if email:
+            obj = Lead.objects.filter(email__iexact=email).order_by('id').first()
+        if not obj and domain and self.city_id and self.state_id:
+            obj = Lead.objects.filter(domain__iexact=domain, city_id=self.city_id, state_id=self.state_id).order_by('id').first()
+
+        if obj:
+            self._merge(obj, rec, st_id, ct_id)
+            return
+        try:
+            # Savepoint so a unique violation (e.g. from a concurrent worker) can be recovered from
+            with transaction.atomic():
+                Lead.objects.create(
+                    business_name=rec['business_name'],
+                    website=rec['website'],
+                    email=email,
+                    phone=rec['phone'],
+                    phone_normalized=rec['phone_normalized'],
+                    area_code=rec['area_code'],
+                    address=rec['address'],
+                    category_id=self.category_id,
+                    state_id=st_id,
+                    city_id=ct_id,
+                    domain=domain,
+                    quality_score=rec['quality_score'],
+                    extra=rec['extra'],
+                    source_file=self.source_file,
+                )
+        except IntegrityError:
+            # If unique constraint triggers, fetch existing and update
+            existing = None
+            if domain and st_id and ct_id:
+                existing = Lead.objects.filter(domain__iexact=domain, state_id=st_id, city_id=ct_id).order_by('id').first()
+            if not existing and email:
+                existing = Lead.objects.filter(email__iexact=email).order_by('id').first()
+            if existing:
+                self._merge(existing, rec, st_id, ct_id)
+
+    def _merge(self, obj: Lead, rec: dict, st_id, ct_id):
+        # Update minimal fields and last_seen
+        obj.business_name = rec['business_name'] or obj.business_name
+        obj.website = rec['website'] or obj.website
+        obj.email = rec['email'] or obj.email
+        if rec['phone']:
+            obj.phone, obj.phone_normalized, obj.area_code = rec['phone'], rec['phone_normalized'], rec['area_code']
+        obj.address = rec['address'] or obj.address
+        obj.category_id = obj.category_id or self.category_id
+        obj.state_id = obj.state_id or st_id
+        obj.city_id = obj.city_id or ct_id
+        obj.domain = obj.domain or rec['domain']
+        obj.quality_score = max(obj.quality_score, rec['quality_score'])
+        obj.source_file = self.source_file
+        obj.save()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+STAGE_TABLE = 'leads_lead_stage'
+
+STAGE_COLUMNS = [
+    'seq', 'business_name', 'website', 'email', 'phone', 'phone_normalized', 'area_code', 'address',
+    'domain', 'quality_score', 'state_id', 'city_id', 'extra',
+]
+
+CREATE_STAGE_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} (
+    seq integer NOT NULL,
+    business_name varchar(255) NOT NULL,
+    website varchar(255),
+    email varchar(255),
+    phone varchar(100),
+    phone_normalized varchar(16),
+    area_code varchar(3),
+    address text,
+    domain varchar(255),
+    quality_score integer NOT NULL,
+    state_id bigint,
+    city_id bigint,
+    extra jsonb NOT NULL,
+    lead_id bigint
+) ON COMMIT DELETE ROWS
+"""
+
+# Merge rules shared by the UPDATE of matched leads and the ON CONFLICT
+# branches of the INSERTs; mirrors RowLeadWriter._merge.
+MERGE_ASSIGNMENTS = """
+    business_name = COALESCE({src}.business_name, l.business_name),
+    website = COALESCE({src}.website, l.website),
+    email = COALESCE({src}.email, l.email),
+    phone = COALESCE({src}.phone, l.phone),
+    phone_normalized = CASE WHEN {src}.phone IS NOT NULL THEN {src}.phone_normalized ELSE l.phone_normalized END,
+    area_code = CASE WHEN {src}.phone IS NOT NULL THEN {src}.area_code ELSE l.area_code END,
+    address = COALESCE({src}.address, l.address),
+    category_id = COALESCE(l.category_id, %(category_id)s),
+    state_id = COALESCE(l.state_id, {src}.state_id),
+    city_id = COALESCE(l.city_id, {src}.city_id),
+    domain = COALESCE(l.domain, {src}.domain),
+    quality_score = GREATEST(l.quality_score, {src}.quality_score),
+    source_file_id = %(source_file_id)s,
+    updated_at = now(),
+    last_seen_at = now()
+"""
+
+# leads_lead_key holds every lead's lower(email) once, whatever its state
+MATCH_EMAIL_SQL = f"""
+UPDATE {STAGE_TABLE} s SET lead_id = k.id
+FROM leads_lead_key k
+WHERE s.email IS NOT NULL AND k.email_lower = lower(s.email)
+"""
+
+MATCH_FILE_GEO_SQL = f"""
+UPDATE {STAGE_TABLE} s SET lead_id = l.id
+FROM leads_lead l
+WHERE s.lead_id IS NULL AND s.domain IS NOT NULL AND l.domain IS NOT NULL
+  AND lower(l.domain) = lower(s.domain)
+  AND l.city_id = %(city_id)s AND l.state_id = %(state_id)s
+"""
+
+MATCH_ROW_GEO_SQL = f"""
+UPDATE {STAGE_TABLE} s SET lead_id = l.id
+FROM leads_lead l
+WHERE s.lead_id IS NULL AND s.domain IS NOT NULL AND l.domain IS NOT NULL
+  AND lower(l.domain) = lower(s.domain)
+  AND l.city_id = s.city_id AND l.state_id = s.state_id
+"""
+
+UPDATE_MATCHED_SQL = f"""
+UPDATE leads_lead l SET {MERGE_ASSIGNMENTS.format(src='s')}
+FROM (
+    SELECT DISTINCT ON (lead_id) * FROM {STAGE_TABLE}
+    WHERE lead_id IS NOT NULL
+    ORDER BY lead_id, seq DESC
+) s
+WHERE l.id = s.lead_id
+"""
+
+INSERT_SQL = f"""
+INSERT INTO leads_lead AS l (
+    business_name, website, email, phone, phone_normalized, area_code, address, category_id, state_id, city_id,
+    domain, quality_score, extra, source_file_id, created_at, updated_at, last_seen_at
+)
+SELECT
+    s.business_name, s.website, s.email, s.phone, s.phone_normalized, s.area_code, s.address,
+    %(category_id)s, s.state_id, s.city_id,
+    s.domain, s.quality_score, s.extra, %(source_file_id)s, now(), now(), now()
+FROM {STAGE_TABLE} s
+WHERE s.lead_id IS NULL AND {{where}}
+ORDER BY s.seq
+ON CONFLICT {{target}} DO UPDATE SET {MERGE_ASSIGNMENTS.format(src='EXCLUDED')}
+"""
+
+INSERT_WITH_EMAIL_SQL = INSERT_SQL.format(
+    where='s.email IS NOT NULL',
+    # uniq_lead_email_state: the partitions' arbiter. An email another state's
+    # lead took after MATCH_EMAIL_SQL fails on leads_lead_key (see flush)
+    target='(lower(email), state_id) WHERE email IS NOT NULL',
+)
+
+INSERT_WITHOUT_EMAIL_SQL = INSERT_SQL.format(
+    where='s.email IS NULL',
+    target='(lower(domain), city_id, state_id) WHERE domain IS NOT NULL',
+)
+
+
+# unique_violation; see BulkLeadWriter.flush
+UNIQUE_VIOLATION = '23505'
+MAX_FLUSH_ATTEMPTS = 3
+
+
+def _copy_value(v):
+    if v is None:
+        return r'\N'
+    if isinstance(v, str):
+        return v.replace('\x00', '')
+    return v
+
+
+class BulkLeadWriter:
+    """Stream leads into a temp staging table with COPY and merge them set-wise.
+
+    Rows are collapsed in memory first with the same matching rules the row
+    path applies sequentially, so each INSERT ... ON CONFLICT statement sees at
+    most one staged row per unique key.
+    """
+
+    def __init__(self, source_file, category_id, state_id, city_id, batch_size: int = 5000):
+        self.source_file = source_file
+        self.category_id = category_id
+        self.state_id = state_id
+        self.city_id = city_id
+        self.batch_size = batch_size
+        self.pending: list[dict] = []
+        self._by_email: dict[str, dict] = {}
+        self._by_domain: dict[tuple, dict] = {}
+
+    def write(self, rec: dict, st_id, ct_id):
+        rec = dict(rec, state_id=st_id, city_id=ct_id)
+        obj = self._match(rec)
+        if obj is None:
+            self.pending.append(rec)
+            self._index(rec)
+        else:
+            self._unindex(obj)
+            self._merge(obj, rec)
+            self._index(obj)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def _match(self, rec: dict):
+        email, domain = rec['email'], rec['domain']
+        if email and email.lower() in self._by_email:
+            return self._by_email[email.lower()]
+        # '' is a real value for the unique index (only NULL is exempt), so it must collapse too
+        if domain is not None and self.city_id and self.state_id:
+            obj = self._by_domain.get((domain.lower(), self.city_id, self.state_id))
+            if obj is not None:
+                return obj
+        if domain is not None and rec['state_id'] and rec['city_id']:
+            return self._by_domain.get((domain.lower(), rec['city_id'], rec['state_id']))
+        return None
+
+    def _index(self, rec: dict):
+        if rec['email']:
+            self._by_email[rec['email'].lower()] = rec
+        if rec['domain'] is not None:
+            self._by_domain[(rec['domain'].lower(), rec['city_id'], rec['state_id'])] = rec
+
+    def _unindex(self, rec: dict):
+        if rec['email']:
+            self._by_email.pop(rec['email'].lower(), None)
+        if rec['domain'] is not None:
+            self._by_domain.pop((rec['domain'].lower(), rec['city_id'], rec['state_id']), None)
+
+    @staticmethod
+    def _merge(obj: dict, rec: dict):
+        obj['business_name'] = rec['business_name'] or obj['business_name']
+        for f in ('website', 'email', 'address'):
+            obj[f] = rec[f] or obj[f]
+        if rec['phone']:
+            obj['phone'], obj['phone_normalized'], obj['area_code'] = rec['phone'], rec['phone_normalized'], rec['area_code']
+        for f in ('state_id', 'city_id', 'domain'):
+            obj[f] = obj[f] or rec[f]
+        obj['quality_score'] = max(obj['quality_score'], rec['quality_score'])
+
+    def flush(self):
+        if not self.pending:
+            return
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        for seq, rec in enumerate(self.pending):
+            w.writerow([
+                _copy_value(v) for v in (
+                    seq, rec['business_name'], rec['website'], rec['email'], rec['phone'],
+                    rec['phone_normalized'], rec['area_code'], rec['address'],
+                    rec['domain'], rec['quality_score'], rec['state_id'], rec['city_id'],
+                    json.dumps(rec['extra']).replace('\\u0000', ''),
+                )
+            ])
+
+        params = {
+            'category_id': self.category_id,
+            'state_id': self.state_id,
+            'city_id': self.city_id,
+            'source_file_id': self.source_file.id,
+        }
+        for attempt in range(1, MAX_FLUSH_ATTEMPTS + 1):
+            try:
+                self._merge_staged(buf, params)
+                break
+            except IntegrityError as e:
+                # Each INSERT arbitrates on one unique index only. A lead another
+                # worker committed after the MATCH steps ran, sharing the other
+                # key (email vs domain+city+state) or the same email in another
+                # state (leads_lead_key), raises instead of merging.
+                # The savepoint is rolled back; matching again now finds it.
+                if attempt == MAX_FLUSH_ATTEMPTS or getattr(e.__cause__, 'pgcode', None) != UNIQUE_VIOLATION:
+                    raise
+
+        self.pending = []
+        self._by_email.clear()
+        self._by_domain.clear()
+
+    def _merge_staged(self, buf: io.StringIO, params: dict):
+        buf.seek(0)
+        # Staging rows are dropped at COMMIT, so the whole merge must share one transaction
+        with transaction.atomic(), connection.cursor() as cur:
+            cur.execute(CREATE_STAGE_SQL)
+            cur.execute(f'TRUNCATE {STAGE_TABLE}')
+            cur.copy_expert(
+                f"COPY {STAGE_TABLE} ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buf,
+            )
+            # Autovacuum never analyzes temp tables; without stats the matches plan as nested loops
+            cur.execute(f'ANALYZE {STAGE_TABLE}')
+            cur.execute(MATCH_EMAIL_SQL)
+            if self.city_id and self.state_id:
+                cur.execute(MATCH_FILE_GEO_SQL, params)
+            cur.execute(MATCH_ROW_GEO_SQL)
+            cur.execute(UPDATE_MATCHED_SQL, params)
+            cur.execute(INSERT_WITH_EMAIL_SQL, params)
+            cur.execute(INSERT_WITHOUT_EMAIL_SQL, params)
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,7 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'leads_dashboard.settings')
+# Serve the async list, export, API and lookup views (see leads/urls.py)
+os.environ.setdefault('ASYNC_VIEWS', '1')
+application = get_asgi_application()
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 import dj_database_url
+import environ
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -16,12 +17,15 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.postgres',
+    'django.contrib.humanize',
     'leads',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'leads.profiling.RequestProfilingMiddleware',
+    'leads.routing.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -34,7 +38,8 @@ ROOT_URLCONF = 'leads_dashboard.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timed per request by RequestProfilingMiddleware
+        'BACKEND': 'leads.profiling.ProfiledTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -49,17 +54,50 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'leads_dashboard.wsgi.application'
+ASGI_APPLICATION = 'leads_dashboard.asgi.application'
+# Set by leads_dashboard/asgi.py: route the list, export, API and lookup URLs to their async views
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+# Under ASGI each request runs its queries on its own thread and connection, so persistent connections would pile up
+CONN_MAX_AGE = 0 if ASYNC_VIEWS else 600
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL:
-    default_db = dj_database_url.parse(DATABASE_URL, conn_max_age=600)
+    default_db = dj_database_url.parse(DATABASE_URL, conn_max_age=CONN_MAX_AGE)
 else:
     default_db = dj_database_url.parse(
         f"postgres://{os.environ.get('DB_USER','leads')}:{os.environ.get('DB_PASSWORD','leads')}@{os.environ.get('DB_HOST','db')}:{os.environ.get('DB_PORT','5432')}/{os.environ.get('DB_NAME','leads')}",
-        conn_max_age=600,
+        conn_max_age=CONN_MAX_AGE,
     )
 DATABASES = {'default': default_db}
 
+# Optional read replica for the read-only views (leads.routing); writes and management commands stay on default
+REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(REPLICA_DATABASE_URL, conn_max_age=CONN_MAX_AGE)
+    DATABASES['replica'].setdefault('OPTIONS', {})['connect_timeout'] = int(os.environ.get('REPLICA_CONNECT_TIMEOUT', '2'))
+    # Tests read the default test database through the replica alias
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['leads.routing.ReplicaRouter']
+# Fall back to default when the replica is further behind than this, re-checked every REPLICA_CHECK_SECONDS
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '30'))
+REPLICA_CHECK_SECONDS = float(os.environ.get('REPLICA_CHECK_SECONDS', '10'))
+# After save_view the client reads from default for this long, so it sees its own write
+READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', '10'))
+
+# Query results for the leads list (lead-id pages, counts, facets), keyed by the data generation that
+# ingest_local bumps. RESULT_CACHE_URL picks the backend: locmemcache:// (per process, LRU eviction
+# beyond MAX_ENTRIES), filecache:///path/to/dir, or redis://host:6379/1
+RESULT_CACHE_URL = os.environ.get('RESULT_CACHE_URL', 'locmemcache://leads-results?MAX_ENTRIES=5000')
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'results': environ.Env.cache_url_config(RESULT_CACHE_URL),
+}
+# Safety-net expiry for cached results, and how often each process re-reads the generation number
+RESULT_CACHE_SECONDS = int(os.environ.get('RESULT_CACHE_SECONDS', '3600'))
+RESULT_CACHE_GENERATION_TTL = float(os.environ.get('RESULT_CACHE_GENERATION_TTL', '5'))
+# Hit/miss counters are kept per process and added to the ResultCacheStat table this often
+RESULT_CACHE_STATS_FLUSH_SECONDS = float(os.environ.get('RESULT_CACHE_STATS_FLUSH_SECONDS', '30'))
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = 'en-us'
@@ -73,3 +111,44 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Counts whose planner estimate is at or above this are shown as approximate instead of running COUNT(*)
+EXACT_COUNT_THRESHOLD = int(os.environ.get('EXACT_COUNT_THRESHOLD', '50000'))
+
+# Rows fetched per server-side cursor round trip when streaming CSV exports
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '2000'))
+
+# Background export jobs (export_worker): output directory, and rows per cursor fetch / progress update
+EXPORT_ROOT = Path(os.environ.get('EXPORT_ROOT', BASE_DIR / 'exports'))
+EXPORT_JOB_CHUNK_SIZE = int(os.environ.get('EXPORT_JOB_CHUNK_SIZE', '10000'))
+
+# Facet counts on the leads list: exact grouped query below FACET_EXACT_LIMIT estimated rows and within
+# FACET_TIMEOUT_MS, otherwise served from the rollup tables
+FACET_EXACT_LIMIT = int(os.environ.get('FACET_EXACT_LIMIT', '250000'))
+FACET_TIMEOUT_MS = int(os.environ.get('FACET_TIMEOUT_MS', '300'))
+FACET_CACHE_SECONDS = int(os.environ.get('FACET_CACHE_SECONDS', '300'))
+FACET_TOP_CITIES = int(os.environ.get('FACET_TOP_CITIES', '20'))
+
+# Browser cache lifetime (seconds) of the type-ahead lookup responses; the server copy follows the data generation
+LOOKUP_MAX_AGE = int(os.environ.get('LOOKUP_MAX_AGE', '300'))
+
+# Filter/sort usage counters for advise_indexes (leads.telemetry), buffered per process between writes
+FILTER_TELEMETRY = os.environ.get('FILTER_TELEMETRY', '1') == '1'
+FILTER_TELEMETRY_FLUSH_SECONDS = float(os.environ.get('FILTER_TELEMETRY_FLUSH_SECONDS', '30'))
+
+# Request profiling (leads.profiling): Server-Timing header, statements listed per request in the
+# `leads.requests` log line, and the threshold/sample rate for the `leads.slow_queries` log
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') == '1'
+SLOWEST_QUERIES = int(os.environ.get('SLOWEST_QUERIES', '3'))
+SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', '1.0'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {
+        'leads.requests': {'handlers': ['console'], 'level': os.environ.get('REQUEST_LOG_LEVEL', 'INFO'), 'propagate': False},
+        'leads.slow_queries': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}